@@ -5,10 +5,13 @@ import adsk.core, adsk.fusion, traceback
 import subprocess, os, platform
 from shutil import copyfile
 import time
+import hashlib
 import csv
+import json
 import re
 from datetime import date
 from .Modules import xlsxwriter
+from .Modules.xlsxwriter.utility import xl_rowcol_to_cell
 
 # Globals
 app = adsk.core.Application.get()
@@ -18,26 +21,110 @@ if app:
 addin_path = os.path.dirname(os.path.realpath(__file__)) 
 
 defaultExportStep = False
+defaultExportStl = False
+defaultExport3MF = False
 defaultProjectName = ''
 defaultProductName = ''
 defaultOwner = ''
 defaultDesigner = ''
+defaultDataOnly = False
+defaultIndentedBOM = False
+defaultSubassemblySheets = False
+defaultExportCSV = False
+defaultExportJSON = False
+defaultUseSharedCache = False
+defaultCacheDirectory = os.path.join(os.path.expanduser('~'), 'BOMshot Cache')
+defaultCacheSizeMB = 2048
+defaultBatchFolder = False
+defaultPhysicalProperties = False
+defaultPropertyAccuracy = 'Medium'
+defaultPropertyCacheFile = os.path.join(os.path.expanduser('~'), 'BOMshot Physical Properties.json')
 
 cameraBackup = app.activeViewport.camera
 gridVisibilityBackup = False
 
+# Project cover sheet template, captured from the first workbook built
+projectTemplate = None
+projectPlaceholders = {
+    'projectName': 'E3',
+    'productName': 'E4',
+    'owner': 'E5',
+    'designer': 'E6',
+    'completionDate': 'E7',
+}
+
 # global set of event handlers to keep them referenced for the duration of the command
 handlers = []
 
-def timing(f):
-    def wrap(*args, **kwargs):
-        time1 = time.time()
-        ret = f(*args, **kwargs)
-        time2 = time.time()
-        print('{:s} function took {:.3f} ms'.format(f.__name__, (time2-time1)*1000.0))
+class Tracer:
+    # Records spans as Chrome trace-event JSON (chrome://tracing, Perfetto).
+    # Events are kept as plain tuples and only formatted when written so the
+    # tracer is cheap enough to leave on for every run.
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._events = []
+        self._origin = time.perf_counter()
+
+    def _now(self):
+        return (time.perf_counter() - self._origin) * 1000000.0
+
+    def span(self, name, **args):
+        return _TraceSpan(self, name, args)
+
+    def complete(self, name, start, duration, args):
+        self._events.append((name, start, duration, args))
+
+    def counter(self, name, **values):
+        self._events.append((name, self._now(), None, values))
+
+    def totals(self):
+        # Seconds spent in each kind of span.
+        totals = {}
+        for eventName, start, duration, args in self._events:
+            if duration is not None:
+                totals[eventName] = totals.get(eventName, 0.0) + duration / 1000000.0
+        return totals
+
+    def toJSON(self):
+        pid = os.getpid()
+        events = []
+        for eventName, start, duration, args in self._events:
+            event = {'name': eventName, 'cat': 'BOMshot', 'pid': pid, 'tid': 0, 'ts': round(start, 3)}
+            if duration is None:
+                event['ph'] = 'C'
+            else:
+                event['ph'] = 'X'
+                event['dur'] = round(duration, 3)
+            if args:
+                event['args'] = args
+            events.append(event)
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write(self, filename):
+        with open(filename, 'w') as traceFile:
+            json.dump(self.toJSON(), traceFile)
+
+class _TraceSpan:
+    __slots__ = ('_tracer', '_name', 'args', '_start')
+
+    def __init__(self, tracer, name, args):
+        self._tracer = tracer
+        self._name = name
+        self.args = args
+
+    def __enter__(self):
+        self._start = self._tracer._now()
+        return self
+
+    def __exit__(self, excType, excValue, excTraceback):
+        if excType is not None:
+            self.args['error'] = excType.__name__
+        self._tracer.complete(self._name, self._start, self._tracer._now() - self._start, self.args)
+        return False
 
-        return ret
-    return wrap
+tracer = Tracer()
 
 def run(context):
     try:
@@ -104,10 +191,23 @@ class BOMCommandCreatedHandler(adsk.core.CommandCreatedEventHandler):
 
             inputs.addImageCommandInput('image', '', 'resources/Icon_128.png')
             inputs.addBoolValueInput('exportStep', 'Export STEP', True, "", defaultExportStep)
+            inputs.addBoolValueInput('exportStl', 'Export STL', True, "", defaultExportStl)
+            inputs.addBoolValueInput('export3MF', 'Export 3MF', True, "", defaultExport3MF)
             inputs.addStringValueInput('projectName', 'Project Name', defaultProjectName)
             inputs.addStringValueInput('productName', 'Product Name', defaultProductName)
             inputs.addStringValueInput('owner', 'Owner', defaultOwner)
             inputs.addStringValueInput('designer', 'Designer', defaultDesigner)
+            inputs.addBoolValueInput('dataOnly', 'Data Only (no thumbnails)', True, "", defaultDataOnly)
+            inputs.addBoolValueInput('indentedBOM', 'Indented BOM Sheet', True, "", defaultIndentedBOM)
+            inputs.addBoolValueInput('subassemblySheets', 'Subassembly Sheets', True, "", defaultSubassemblySheets)
+            inputs.addBoolValueInput('exportCSV', 'Also Write CSV', True, "", defaultExportCSV)
+            inputs.addBoolValueInput('exportJSON', 'Also Write JSON', True, "", defaultExportJSON)
+            inputs.addBoolValueInput('useSharedCache', 'Shared Cache', True, "", defaultUseSharedCache)
+            inputs.addBoolValueInput('physicalProperties', 'Mass, Volume and Size', True, "", defaultPhysicalProperties)
+            accuracyInput = inputs.addDropDownCommandInput('propertyAccuracy', 'Property Accuracy', adsk.core.DropDownStyles.TextListDropDownStyle)
+            for accuracy in physicalAccuracies:
+                accuracyInput.listItems.add(accuracy, accuracy == defaultPropertyAccuracy)
+            inputs.addBoolValueInput('batchFolder', 'Batch: All Designs in Folder', True, "", defaultBatchFolder)
 
         except:
             if ui:
@@ -128,6 +228,10 @@ class BOMCommandExecuteHandler(adsk.core.CommandEventHandler):
             for input in inputs:
                 if input.id == 'exportStep':
                     bom.exportStep = input.value
+                if input.id == 'exportStl':
+                    bom.exportStl = input.value
+                if input.id == 'export3MF':
+                    bom.export3MF = input.value
                 if input.id == 'projectName':
                     bom.projectName = input.value
                 if input.id == 'productName':
@@ -136,8 +240,29 @@ class BOMCommandExecuteHandler(adsk.core.CommandEventHandler):
                     bom.owner = input.value
                 if input.id == 'designer':
                     bom.designer = input.value
-
-            bom.extractBOM()
+                if input.id == 'dataOnly':
+                    bom.dataOnly = input.value
+                if input.id == 'indentedBOM':
+                    bom.indentedBOM = input.value
+                if input.id == 'subassemblySheets':
+                    bom.subassemblySheets = input.value
+                if input.id == 'exportCSV':
+                    bom.exportCSV = input.value
+                if input.id == 'exportJSON':
+                    bom.exportJSON = input.value
+                if input.id == 'useSharedCache':
+                    bom.cacheDirectory = defaultCacheDirectory if input.value else ''
+                if input.id == 'physicalProperties':
+                    bom.physicalProperties = input.value
+                if input.id == 'propertyAccuracy':
+                    bom.propertyAccuracy = input.selectedItem.name
+                if input.id == 'batchFolder':
+                    bom.batchFolder = input.value
+
+            if bom.batchFolder:
+                bom.extractFolder()
+            else:
+                bom.extractBOM()
             args.isValidResult = True
 
             app.activeViewport.camera = cameraBackup
@@ -149,13 +274,90 @@ class BOMCommandExecuteHandler(adsk.core.CommandEventHandler):
         # Force the termination of the command.
         adsk.terminate()   
 
+class BOMRow:
+    # One BOM line: a unique component and its instance count. `values` gives
+    # the data columns of the BOM sheet, written after the thumbnail.
+    # `physical` holds the physicalColumns values when they are requested.
+    __slots__ = ('component', 'name', 'instances', 'material', 'thumbnail', 'physical')
+
+    def __init__(self, component, name, material, thumbnail=None):
+        self.component = component
+        self.name = name
+        self.instances = 1
+        self.material = material
+        self.thumbnail = thumbnail
+        self.physical = None
+
+    def values(self):
+        return [self.name, self.instances, self.material]
+
+class BOMNode:
+    # A component in the assembly hierarchy: its BOM row (None for components
+    # without a material), thumbnail and direct children. The children are
+    # recorded the first time the component is expanded, as a dict of child
+    # node to quantity, so they are per component and not per occurrence.
+    __slots__ = ('name', 'row', 'thumbnail', 'children')
+
+    def __init__(self, name, row=None, thumbnail=None):
+        self.name = name
+        self.row = row
+        self.thumbnail = thumbnail
+        self.children = None
+
+    def addChild(self, node):
+        self.children[node] = self.children.get(node, 0) + 1
+
+    def walk(self):
+        # Yields (level, item number, node, quantity) for every line of the
+        # indented BOM below this node, depth first.
+        stack = [(1, '', iter(self.children.items()))]
+        counters = [0]
+        while stack:
+            level, prefix, children = stack[-1]
+            entry = next(children, None)
+            if entry is None:
+                stack.pop()
+                counters.pop()
+                continue
+            counters[-1] += 1
+            node, quantity = entry
+            itemNumber = prefix + str(counters[-1])
+            yield level, itemNumber, node, quantity
+            if node.children:
+                stack.append((level + 1, itemNumber + '.', iter(node.children.items())))
+                counters.append(0)
+
 class BOM:
     def __init__(self):
         self._exportStep = defaultExportStep
+        self._exportStl = defaultExportStl
+        self._export3MF = defaultExport3MF
+        self._exports = None
         self._projectName = defaultProjectName
         self._productName = defaultProductName
         self._owner = defaultOwner
         self._designer = defaultDesigner
+        self._dataOnly = defaultDataOnly
+        self._indentedBOM = defaultIndentedBOM
+        self._subassemblySheets = defaultSubassemblySheets
+        self._exportCSV = defaultExportCSV
+        self._exportJSON = defaultExportJSON
+        self._cacheDirectory = defaultCacheDirectory if defaultUseSharedCache else ''
+        self._cacheSizeMB = defaultCacheSizeMB
+        self._batchFolder = defaultBatchFolder
+        self._physicalProperties = defaultPhysicalProperties
+        self._propertyAccuracy = defaultPropertyAccuracy
+        self._propertyCacheFile = defaultPropertyCacheFile
+        self._propertyCache = None
+        self._physicalQueue = []
+        self._previous = {}
+        self._versionKeys = {}
+        self._recordEntries = []
+        self._cache = None
+        self._nodes = {}
+        self._plan = None
+        self._captures = []
+        self._checkpoint = None
 
     #properties
     @property
@@ -165,6 +367,31 @@ class BOM:
     def exportStep(self, value):
         self._exportStep = value
 
+    @property
+    def exportStl(self):
+        return self._exportStl
+    @exportStl.setter
+    def exportStl(self, value):
+        self._exportStl = value
+
+    @property
+    def export3MF(self):
+        return self._export3MF
+    @export3MF.setter
+    def export3MF(self, value):
+        self._export3MF = value
+
+    @property
+    def exportFormats(self):
+        formats = []
+        if self._exportStep:
+            formats.append('step')
+        if self._exportStl:
+            formats.append('stl')
+        if self._export3MF:
+            formats.append('3mf')
+        return formats
+
     @property
     def projectName(self):
         return self._projectName
@@ -193,35 +420,151 @@ class BOM:
     def designer(self, value):
         self._designer = value
 
-    def addComponentToList(self, list, component, path):
+    @property
+    def dataOnly(self):
+        return self._dataOnly
+    @dataOnly.setter
+    def dataOnly(self, value):
+        self._dataOnly = value
+
+    @property
+    def indentedBOM(self):
+        return self._indentedBOM
+    @indentedBOM.setter
+    def indentedBOM(self, value):
+        self._indentedBOM = value
+
+    @property
+    def subassemblySheets(self):
+        return self._subassemblySheets
+    @subassemblySheets.setter
+    def subassemblySheets(self, value):
+        self._subassemblySheets = value
+
+    @property
+    def exportCSV(self):
+        return self._exportCSV
+    @exportCSV.setter
+    def exportCSV(self, value):
+        self._exportCSV = value
+
+    @property
+    def exportJSON(self):
+        return self._exportJSON
+    @exportJSON.setter
+    def exportJSON(self, value):
+        self._exportJSON = value
+
+    @property
+    def cacheDirectory(self):
+        return self._cacheDirectory
+    @cacheDirectory.setter
+    def cacheDirectory(self, value):
+        self._cacheDirectory = value
+
+    @property
+    def cacheSizeMB(self):
+        return self._cacheSizeMB
+    @cacheSizeMB.setter
+    def cacheSizeMB(self, value):
+        self._cacheSizeMB = value
+
+    @property
+    def physicalProperties(self):
+        return self._physicalProperties
+    @physicalProperties.setter
+    def physicalProperties(self, value):
+        self._physicalProperties = value
+
+    @property
+    def propertyAccuracy(self):
+        return self._propertyAccuracy
+    @propertyAccuracy.setter
+    def propertyAccuracy(self, value):
+        self._propertyAccuracy = value
+
+    @property
+    def propertyCacheFile(self):
+        return self._propertyCacheFile
+    @propertyCacheFile.setter
+    def propertyCacheFile(self, value):
+        self._propertyCacheFile = value
+
+    @property
+    def batchFolder(self):
+        return self._batchFolder
+    @batchFolder.setter
+    def batchFolder(self, value):
+        self._batchFolder = value
+
+    def addComponentToList(self, list, component, thumbnail):
         # Gather any BOM worthy values from the component
         
         if component.material is not None:
-            info = {
-                'component': component,
-                'thumbnail': path + '/images/' + name(component.name)  + '.png',
-                'name': name(component.name),
-                'instances': 1,
-                'material': component.material.name,
-            }
-
-            list.append(info)
+            row = BOMRow(component, self._plan.name(component.name), component.material.name, thumbnail)
+            list.append(row)
+            return row
+        return None
 
     def collectInstance(self, list, occ, path):
+        # Returns the hierarchy node of the occurrence's component.
         component = occ.component
-        instanceExistInList = False
-        for listI in list:
-            if listI['component'] == component:
+        # Nodes are looked up by the component's persistent id; components
+        # without a row (no material) get a node too so they are only
+        # processed once.
+        key = component.id
+        node = self._nodes.get(key)
+        if node is not None:
+            if node.row is not None:
                 # Increment the instance count of the existing row.
-                listI['instances'] += 1
-                instanceExistInList = True
-                break
-
-        if not instanceExistInList:
-            self.addComponentToList(list, component, path)
-            takePhoto(occ, path)
-            if self._exportStep:
-                write_component(path, component)
+                node.row.instances += 1
+            return node
+
+        # Output paths are planned here; nothing is written until the
+        # traversal is complete.
+        plan = self._plan
+        thumbnail = None if self._dataOnly else plan.file(path + '/images', component.name, '.png')
+        row = self.addComponentToList(list, component, thumbnail)
+        node = BOMNode(plan.name(component.name), row, thumbnail)
+        self._nodes[key] = node
+        tracer.counter('bom', components=len(list))
+        sourceKey = componentSourceKey(occ)
+        versionKey = componentVersionKey(occ, sourceKey, self._versionKeys)
+        exportBase = plan.file(path, component.name) if self._exports is not None else None
+        self._recordEntries.append((key, node, versionKey, exportBase))
+        # Checkpoint entries name the component version, so files written
+        # before the component was edited are not taken as done.
+        checkpointKey = '{}|{}'.format(key, versionKey)
+
+        # Components unchanged since the previous run keep its files.
+        previous = self._previous.get(key)
+        if previous is not None and versionKey is not None and previous[3] == versionKey:
+            if thumbnail is not None and previous[4] == thumbnail:
+                self._checkpoint.keep(thumbnail, checkpointKey)
+            if exportBase is not None and previous[5] == exportBase:
+                for exportFormat in self._exports.formats:
+                    self._checkpoint.keep(exportBase + exportTargets[exportFormat][0], checkpointKey)
+
+        # Captures and exports run after the traversal so they don't
+        # alternate with it; both keep one entry per component.
+        if row is not None and self._physicalProperties:
+            self._physicalQueue.append((row, versionKey))
+        if thumbnail is not None and not self._checkpoint.isDone(thumbnail, checkpointKey):
+            self._captures.append((occ, thumbnail, sourceKey, checkpointKey))
+        if exportBase is not None:
+            self._exports.add(component, exportBase, sourceKey, checkpointKey)
+        return node
+
+    def projectInfo(self):
+        # Build project info object
+        return {
+            'projectName': self._projectName,
+            'productName': self._productName,
+            'owner': self._owner,
+            'designer': self._designer,
+            'rootImage': '',
+            'logoImage': ''
+        }
 
     def extractBOM(self):
 
@@ -232,19 +575,6 @@ class BOM:
             ui.messageBox('No active design', title)
             return
         
-        root = product.rootComponent
-        design.activateRootComponent()
-
-        # Build project info object
-        projectInfo = {
-            'projectName': self._projectName,
-            'productName': self._productName,
-            'owner': self._owner,
-            'designer': self._designer,
-            'rootImage': '',
-            'logoImage': ''
-        }
-        
         fileDialog = ui.createFileDialog()
         fileDialog.isMultiSelectEnabled = False
         fileDialog.title = " filename"
@@ -254,41 +584,312 @@ class BOM:
         dialogResult = fileDialog.showSave()
         if dialogResult == adsk.core.DialogResults.DialogOK:
             filename = fileDialog.filename
-            dst_directory = os.path.splitext(filename)[0] + '_files'
         else:
             return
+        tracer.reset()
+        self._openCache()
+        try:
+            components, failures = self._extractDesign(design, filename, self.projectInfo(), 'BOMshot')
+            self._closeCache()
+        except ExtractionCancelled:
+            ui.messageBox('Extraction cancelled. Extract to the same file again to resume.', 'BOMshot')
+            return
+        finally:
+            self._cache = None
+            tracer.write(os.path.splitext(filename)[0] + '.trace.json')
+
+        if failures:
+            ui.messageBox('{} exports failed:\n{}'.format(len(failures), '\n'.join(failures[:10])), 'BOMshot')
+        if components == 0:
+            ui.messageBox('No components found', 'BOMshot')
+            return
+
+        dialogResult = ui.messageBox('BOM Extracted. Open file?', 'BOMshot', adsk.core.MessageBoxButtonTypes.OKCancelButtonType, adsk.core.MessageBoxIconTypes.InformationIconType)
+        if dialogResult == adsk.core.DialogResults.DialogOK:
+            openWithDefaultApplication(filename)
+
+    def extractFolder(self):
+        # Batch extraction of every design in the folder of the active
+        # document and its subfolders.
+        document = app.activeDocument
+        dataFile = document.dataFile if document else None
+        if dataFile is None:
+            ui.messageBox('Save the design to a project folder first', 'BOMshot')
+            return
+
+        folderDialog = ui.createFolderDialog()
+        folderDialog.title = 'Output folder'
+        if folderDialog.showDialog() != adsk.core.DialogResults.DialogOK:
+            return
+
+        summary = self.extractBatch(designFiles(dataFile.parentFolder), folderDialog.folder)
+        extracted = sum(1 for row in summary if row[2] == 'ok')
+        ui.messageBox('{} of {} designs extracted in {:.0f} s.\nSummary: {}'.format(
+            extracted, len(summary), sum(row[-1] for row in summary),
+            os.path.join(folderDialog.folder, batchSummaryName)), 'BOMshot')
+
+    def extractBatch(self, designs, outputDirectory, projectInfo=None):
+        # Extracts each design, or design data file, to a workbook named
+        # after it in outputDirectory, one after the other in this session.
+        # Data files are opened and closed again. The shared cache and the
+        # cover sheet template carry over from one design to the next and
+        # the cache is trimmed once at the end. A design that fails to open
+        # or extract is recorded and the batch carries on; Cancel stops it. Writes the summary of
+        # per-design timings next to the workbooks and returns its rows.
+        info = self.projectInfo()
+        info.update(projectInfo or {})
+        designs = list(designs)
+        os.makedirs(outputDirectory, exist_ok=True)
+        plan = OutputPlan()
+        summary = []
+        activeDocument = app.activeDocument
+        self._openCache()
+        try:
+            for number, item in enumerate(designs, 1):
+                designName = getattr(item, 'name', '')
+                filename = ''
+                document = None
+                components = 0
+                tracer.reset()
+                start = time.perf_counter()
+                try:
+                    design, document = openDesign(item)
+                    if design is None:
+                        status = 'not a design'
+                    else:
+                        designName = design.rootComponent.name
+                        filename = plan.file(outputDirectory, designName, '.xlsx')
+                        title = 'BOMshot: {} ({} of {})'.format(designName, number, len(designs))
+                        components, failures = self._extractDesign(design, filename, info, title)
+                        if components == 0:
+                            status = 'no components'
+                        elif failures:
+                            status = '{} exports failed'.format(len(failures))
+                        else:
+                            status = 'ok'
+                except ExtractionCancelled:
+                    status = 'cancelled'
+                except Exception as exc:
+                    status = 'error: {}: {}'.format(type(exc).__name__, exc)
+                finally:
+                    seconds = time.perf_counter() - start
+                    if filename:
+                        tracer.write(os.path.splitext(filename)[0] + '.trace.json')
+                    if document is not None:
+                        document.close(False)
+                totals = tracer.totals()
+                summary.append([designName, os.path.basename(filename), status, components,
+                                totals.get('traversal', 0.0), totals.get('capture', 0.0),
+                                totals.get('exports', 0.0), totals.get('physicalProperties', 0.0),
+                                totals.get('buildXLSX', 0.0), seconds])
+                if status == 'cancelled':
+                    break
+            self._closeCache()
+        finally:
+            self._cache = None
+            if activeDocument is not None and activeDocument.isValid:
+                activeDocument.activate()
+            # The summary is written even if the batch stops early, so the
+            # designs done so far are accounted for.
+            writeBatchSummary(summary, os.path.join(outputDirectory, batchSummaryName))
+        return summary
+
+    def _openCache(self):
+        self._cache = SharedCache(self._cacheDirectory, self._cacheSizeMB) if self._cacheDirectory else None
+
+    def _closeCache(self):
+        # Trims the shared cache to its size cap once the files are in it.
+        if self._cache is not None:
+            with tracer.span('trimCache', directory=self._cache.directory) as span:
+                span.args['removed'] = self._cache.trim()
+            self._cache = None
+
+    def _extractDesign(self, design, filename, projectInfo, title):
+        # Extracts one design, writing its files next to filename. Returns
+        # the number of BOM rows and the export failures. On Cancel or an
+        # error the occurrences are unisolated before it propagates.
+        root = design.rootComponent
+        design.activateRootComponent()
+        dst_directory = os.path.splitext(filename)[0] + '_files'
+        progress = Progress(title)
+        try:
+            return self._extractToFile(design, root, filename, dst_directory, dict(projectInfo), progress)
+        except Exception:
+            progress.hide()
+            if not self._dataOnly:
+                Unisolate(root.occurrences)
+            raise
+        finally:
+            progress.hide()
+            # A checkpoint left open here belongs to an unfinished run.
+            if self._checkpoint is not None:
+                self._checkpoint.close()
+                self._checkpoint = None
+
+    def _extractToFile(self, design, root, filename, dst_directory, projectInfo, progress):
         # Gather information about each unique component
         bom = []
 
-        # The path where thumbnails will be saved, updated to use a dynamic base path
-        base_path = dst_directory + '/' + name(design.activeComponent.name)
-
-        takeRootPhoto(root, dst_directory)
+        plan = self._plan = OutputPlan()
+        self._captures = []
+        self._physicalQueue = []
+        # Files written by an earlier, unfinished run to the same file are
+        # not captured or exported again.
+        checkpoint = self._checkpoint = Checkpoint(os.path.splitext(filename)[0] + '.checkpoint.json',
+                                                   {'design': root.name, 'photoSettings': photoSettings})
+        with tracer.span('loadCheckpoint') as span:
+            span.args['resumed'] = checkpoint.open()
+        # The previous run to the same file, compared by component id.
+        record = RunRecord(os.path.splitext(filename)[0] + '.record.json')
+        with tracer.span('loadRecord') as span:
+            previousRun = record.load()
+            span.args['components'] = len(previousRun[1]) if previousRun else 0
+        self._previous = previousRun[1] if previousRun else {}
+        self._versionKeys = {}
+        self._recordEntries = []
 
-        def processComponent(occurrences, path):
+        # The path where thumbnails will be saved, updated to use a dynamic base path
+        base_path = dst_directory + '/' + plan.name(design.activeComponent.name)
+
+        # Data-only runs skip all viewport work: no isolation, no captures.
+        if not self._dataOnly:
+            with tracer.span('takeRootPhoto', component=root.name):
+                takeRootPhoto(root, dst_directory)
+
+        occurrenceCount = 0
+        self._nodes = {}
+        # One traversal records the hierarchy for the flat, indented and
+        # subassembly sheets.
+        hierarchy = BOMNode(plan.name(root.name))
+        hierarchy.children = {}
+        exportFormats = self.exportFormats
+        self._exports = ExportQueue(exportFormats, self._cache, checkpoint) if exportFormats else None
+
+        def processComponent(occurrences, path, parent):
+                # parent is the node whose children are being recorded, or
+                # None when the parent component was already expanded.
+                nonlocal occurrenceCount
                 for occ in occurrences:
-                    self.collectInstance(bom, occ, path)
+                    occurrenceCount += 1
+                    if occurrenceCount % traversalBatchSize == 0:
+                        progress.update(occurrenceCount)
+                    node = self.collectInstance(bom, occ, path)
+                    if parent is not None:
+                        parent.addChild(node)
                     # Recursively process subcomponents if they exist
                     if occ.childOccurrences:
-                        processComponent(occ.childOccurrences, path + '/' + name(occ.component.name))
+                        expand = node.children is None
+                        if expand:
+                            node.children = {}
+                        processComponent(occ.childOccurrences, path + '/' + plan.name(occ.component.name), node if expand else None)
     
         # Start processing from the root component
-        processComponent(root.occurrences, base_path)
+        progress.start('Reading the assembly (%v occurrences)', 0)
+        with tracer.span('traversal', component=root.name) as span:
+            processComponent(root.occurrences, base_path, hierarchy)
+            span.args['occurrences'] = occurrenceCount
+            span.args['components'] = len(bom)
+
+        with tracer.span('makeDirectories') as span:
+            span.args['calls'] = plan.makeDirectories()
+
+        if self._captures:
+            captures = self._captures
+            self._captures = []
+            progress.start('Capturing thumbnails (%v of %m)', len(captures))
+            with tracer.span('capture', components=len(captures)):
+                for number, (occ, imageFile, sourceKey, checkpointKey) in enumerate(captures, 1):
+                    component = occ.component
+                    with tracer.span('takePhoto', component=component.name, path=imageFile) as span:
+                        span.args['cached'] = takePhoto(occ, imageFile, self._cache, sourceKey)
+                    checkpoint.add(imageFile, checkpointKey)
+                    if number % captureBatchSize == 0 or number == len(captures):
+                        checkpoint.save()
+                        progress.update(number)
+
+        failures = []
+        if self._exports is not None:
+            exports = self._exports
+            self._exports = None
+            def exportBatch(number):
+                checkpoint.save()
+                progress.update(number)
+            progress.start('Exporting (%v of %m components)', len(exports))
+            with tracer.span('exports', formats=','.join(exportFormats), components=len(exports)) as span:
+                failures = exports.run(exportBatch)
+                span.args['failures'] = len(failures)
+
+        if self._physicalQueue:
+            queue = self._physicalQueue
+            self._physicalQueue = []
+            if self._propertyCache is None:
+                self._propertyCache = PropertyCache(self._propertyCacheFile)
+            accuracy = self._propertyAccuracy
+            progress.start('Calculating physical properties (%v of %m)', len(queue))
+            with tracer.span('physicalProperties', components=len(queue), accuracy=accuracy) as span:
+                cached = 0
+                try:
+                    for number, (row, versionKey) in enumerate(queue, 1):
+                        key = '{}|{}'.format(versionKey, accuracy) if versionKey else None
+                        values = self._propertyCache.get(key)
+                        if values is None:
+                            values = physicalProperties(row.component, accuracy)
+                            self._propertyCache.put(key, values)
+                        else:
+                            cached += 1
+                        row.physical = values
+                        if number % propertyBatchSize == 0 or number == len(queue):
+                            progress.update(number)
+                finally:
+                    # Keep what was calculated, even for a cancelled run.
+                    self._propertyCache.save()
+                span.args['cached'] = cached
+
+        # The rows keep only plain values from here on; let go of the
+        # Fusion proxies.
+        self._nodes = {}
+        self._plan = None
+        self._previous = {}
+        self._versionKeys = {}
+        components = {}
+        for key, node, versionKey, exportBase in self._recordEntries:
+            row = node.row
+            components[key] = [node.name, row.instances if row else None, row.material if row else None,
+                               versionKey, node.thumbnail, exportBase]
+        self._recordEntries = []
+        changes = None
+        if previousRun is not None:
+            with tracer.span('diff', previous=len(previousRun[1]), components=len(components)) as span:
+                changes = (previousRun[0], diffRecords(previousRun[1], components))
+                span.args['changes'] = len(changes[1])
+        for row in bom:
+            row.component = None
 
         if len(bom) == 0:
-            ui.messageBox('No components found', 'BOMshot')
-            return
+            checkpoint.close(remove=True)
+            return 0, failures
         
-        projectInfo['rootImage'] = dst_directory + '/root.png'
+        if not self._dataOnly:
+            projectInfo['rootImage'] = dst_directory + '/root.png'
         projectInfo['logoImage'] = dst_directory + '/logo.png'
         
-        Unisolate(root.occurrences)
-        
-        buildXLSX(bom, os.path.splitext(filename)[0], projectInfo)
+        if not self._dataOnly:
+            with tracer.span('Unisolate', occurrences=root.occurrences.count):
+                Unisolate(root.occurrences)
         
-        dialogResult = ui.messageBox('BOM Extracted. Open file?', 'BOMshot', adsk.core.MessageBoxButtonTypes.OKCancelButtonType, adsk.core.MessageBoxIconTypes.InformationIconType)
-        if dialogResult == adsk.core.DialogResults.DialogOK:
-            openWithDefaultApplication(filename)
+        progress.start('Building the workbook', 0)
+        with tracer.span('buildXLSX', rows=len(bom)):
+            buildXLSX(bom, os.path.splitext(filename)[0], projectInfo, not self._dataOnly,
+                      hierarchy, self._indentedBOM, self._subassemblySheets, changes)
+
+        if self._exportCSV or self._exportJSON:
+            with tracer.span('writeBOMData', rows=len(bom)):
+                writeBOMData(bom, os.path.splitext(filename)[0], self._exportCSV, self._exportJSON)
+
+        record.save(time.strftime('%Y-%m-%d %H:%M'), components)
+        checkpoint.close(remove=True)
+        self._checkpoint = None
+        return len(bom), failures
 
 def openWithDefaultApplication(filename):
     if platform.system() == 'Darwin':       # macOS
@@ -337,10 +938,18 @@ def takeRootPhoto(component, path):
     if not success:
         ui.messageBox('Failed saving viewport image.')
 
-def takePhoto(occ, base_path):
-    currentComp = occ.component
-    os.makedirs(base_path, exist_ok=True)
-    filePath = os.path.join(base_path, "images")
+# Thumbnail render settings; part of the shared cache key.
+photoWidth = 300
+photoHeight = 300
+photoEyeOffset = (100, -100, 100)
+photoSettings = 'png {}x{} eye {} fit'.format(photoWidth, photoHeight, photoEyeOffset)
+
+def takePhoto(occ, imageFile, cache=None, sourceKey=None):
+    # Saves the thumbnail to its planned file, whose folder already exists.
+    # Returns True if the thumbnail came from the shared cache.
+    cacheKey = cache.key(sourceKey, photoSettings) if cache and sourceKey else None
+    if cacheKey and cache.fetch(cacheKey, '.png', imageFile):
+        return True
 
     # Isolate the component
     occ.isIsolated = True
@@ -355,31 +964,477 @@ def takePhoto(occ, base_path):
     camera.target = cameraTarget
     camera.isFitView = True
     camera.isSmoothTransition = False
-    camera.eye = adsk.core.Point3D.create(100 + cameraTarget.x, -100 + cameraTarget.y, 100 + cameraTarget.z)
+    camera.eye = adsk.core.Point3D.create(photoEyeOffset[0] + cameraTarget.x, photoEyeOffset[1] + cameraTarget.y, photoEyeOffset[2] + cameraTarget.z)
 
     app.activeViewport.camera = camera
     
     app.activeViewport.refresh()
     adsk.doEvents()
 
-    success = app.activeViewport.saveAsImageFile(filePath + '/' + name(currentComp.name)  + '.png', 300, 300)
+    unlinkOutput(imageFile)
+    success = app.activeViewport.saveAsImageFile(imageFile, photoWidth, photoHeight)
     if not success:
         ui.messageBox('Failed saving viewport image.')
+    elif cacheKey:
+        cache.store(cacheKey, '.png', imageFile)
 
     occ.isIsolated = False
+    return False
+
+def componentSourceKey(occ):
+    # Only components referenced from another document have an identity that
+    # holds across projects: the referenced file and its version.
+    if not occ.isReferencedComponent:
+        return None
+    reference = occ.documentReference
+    dataFile = reference.dataFile if reference else None
+    if dataFile is None:
+        return None
+    return '{}@{}'.format(dataFile.id, dataFile.versionNumber)
+
+def componentVersionKey(occ, sourceKey, versionKeys):
+    # The occurrence's component at its current version: the referenced file
+    # version for inserted components. A local component's revisionId
+    # changes whenever it is modified; an assembly's key also covers the
+    # keys of the components in it, so its thumbnail and mass follow its
+    # parts. Keys of local components are kept in versionKeys by id.
+    if sourceKey:
+        return sourceKey
+    stack = [occ.component]
+    while stack:
+        component = stack[-1]
+        if component.id in versionKeys:
+            stack.pop()
+            continue
+        childKeys = []
+        for child in component.occurrences:
+            childKey = componentSourceKey(child) or versionKeys.get(child.component.id)
+            if childKey is None:
+                stack.append(child.component)
+            else:
+                childKeys.append(childKey)
+        if stack[-1] is not component:
+            continue
+        stack.pop()
+        versionKey = component.revisionId
+        if childKeys:
+            childKeys.sort()
+            versionKey += '+' + hashlib.sha1('\n'.join(childKeys).encode('utf-8')).hexdigest()
+        versionKeys[component.id] = versionKey
+    return versionKeys[occ.component.id]
+
+# Accuracy levels offered for physical properties.
+physicalAccuracies = {
+    'Low': adsk.fusion.CalculationAccuracy.LowCalculationAccuracy,
+    'Medium': adsk.fusion.CalculationAccuracy.MediumCalculationAccuracy,
+    'High': adsk.fusion.CalculationAccuracy.HighCalculationAccuracy,
+    'Very High': adsk.fusion.CalculationAccuracy.VeryHighCalculationAccuracy,
+}
+
+def physicalProperties(component, accuracy):
+    # Returns the physicalColumns values of a component. Fusion works in kg
+    # and cm; sizes are converted to mm.
+    properties = component.getPhysicalProperties(physicalAccuracies[accuracy])
+    box = component.boundingBox
+    minPoint = box.minPoint
+    maxPoint = box.maxPoint
+    return [properties.mass, properties.volume, properties.area,
+            (maxPoint.x - minPoint.x) * 10.0, (maxPoint.y - minPoint.y) * 10.0, (maxPoint.z - minPoint.z) * 10.0]
+
+class RunRecord:
+    # A compact record of the last extraction to a file, kept next to it:
+    # for each component id a list of its name, quantity, material, version
+    # key, thumbnail path and export path without an extension. Quantity and
+    # material are None for components that are not BOM lines.
+    # The next run to the same file lists what changed and keeps the files
+    # of unchanged components.
+    def __init__(self, filename):
+        self.filename = filename
+
+    def load(self):
+        # Returns the date and components of the previous run, or None.
+        try:
+            with open(self.filename, encoding='utf-8') as recordFile:
+                record = json.load(recordFile)
+            return record['date'], record['components']
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def save(self, date, components):
+        temporary = '{}.{}.tmp'.format(self.filename, os.getpid())
+        with open(temporary, 'w', encoding='utf-8') as recordFile:
+            json.dump({'date': date, 'components': components}, recordFile, separators=(',', ':'))
+        os.replace(temporary, self.filename)
+
+def diffRecords(previous, current):
+    # Compares the BOM lines of two run records by component id. Returns
+    # (change, part name, previous quantity, quantity, material, details)
+    # lines: added and changed lines in BOM order, then removed ones.
+    changes = []
+    for key, entry in current.items():
+        name, instances, material, versionKey = entry[:4]
+        if instances is None:
+            continue
+        old = previous.get(key)
+        if old is None or old[1] is None:
+            changes.append(('Added', name, None, instances, material, ''))
+            continue
+        details = []
+        if old[0] != name:
+            details.append('renamed from {}'.format(old[0]))
+        if old[1] != instances:
+            details.append('quantity {} to {}'.format(old[1], instances))
+        if old[2] != material:
+            details.append('material {} to {}'.format(old[2], material))
+        if versionKey is not None and old[3] is not None and old[3] != versionKey:
+            details.append('new version')
+        if details:
+            changes.append(('Changed', name, old[1], instances, material, '; '.join(details)))
+    for key, old in previous.items():
+        if old[1] is not None and (key not in current or current[key][1] is None):
+            changes.append(('Removed', old[0], old[1], None, old[2], ''))
+    return changes
+
+class PropertyCache:
+    # Physical properties by component version and accuracy, kept in one
+    # JSON file so later runs don't calculate them again. The file is read
+    # on first use and only written when something was added.
+    def __init__(self, filename):
+        self.filename = filename
+        self._values = None
+        self._changed = False
+
+    def _load(self):
+        try:
+            with open(self.filename, encoding='utf-8') as cacheFile:
+                self._values = json.load(cacheFile)
+        except (OSError, ValueError):
+            self._values = {}
+
+    def get(self, key):
+        if key is None:
+            return None
+        if self._values is None:
+            self._load()
+        return self._values.get(key)
+
+    def put(self, key, values):
+        if key is None:
+            return
+        if self._values is None:
+            self._load()
+        self._values[key] = values
+        self._changed = True
 
-def write_component(component_base_path, component: adsk.fusion.Component):
-    os.makedirs(component_base_path, exist_ok=True)
-    write_step(component_base_path, component)
-
-def write_step(output_path, component: adsk.fusion.Component):
-    file_path = output_path + '/' + name(component.name) + ".stp"
-    if os.path.exists(file_path):
-      return
-    export_manager = component.parentDesign.exportManager
+    def save(self):
+        if not self._changed:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.filename), exist_ok=True)
+            temporary = '{}.{}.tmp'.format(self.filename, os.getpid())
+            with open(temporary, 'w', encoding='utf-8') as cacheFile:
+                json.dump(self._values, cacheFile)
+            os.replace(temporary, self.filename)
+            self._changed = False
+        except OSError:
+            pass
+
+def unlinkOutput(path):
+    # Output files may be hard links to shared cache entries. Remove them
+    # before rendering or exporting to the path, so the new content never
+    # overwrites a cached file in place.
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+class SharedCache:
+    # Thumbnails and exports shared between projects, stored under a hash of
+    # the component's source identity and the output settings. Hits are
+    # hard-linked into the project (copied where links aren't possible) and
+    # touched, so trimming the cache to its size cap removes the least
+    # recently used files first.
+    def __init__(self, directory, sizeMB):
+        self.directory = directory
+        self.maxBytes = int(sizeMB * 1048576)
+
+    def key(self, *parts):
+        return hashlib.sha1('\0'.join(parts).encode('utf-8')).hexdigest()
+
+    def _path(self, key, extension):
+        return os.path.join(self.directory, key[:2], key + extension)
+
+    def fetch(self, key, extension, destination):
+        cached = self._path(key, extension)
+        if not os.path.exists(cached):
+            return False
+        if os.path.lexists(destination):
+            os.remove(destination)
+        try:
+            os.link(cached, destination)
+        except OSError:
+            try:
+                copyfile(cached, destination)
+            except OSError:
+                return False
+        try:
+            os.utime(cached)
+        except OSError:
+            pass
+        return True
 
-    options = export_manager.createSTEPExportOptions(file_path, component)
-    export_manager.execute(options)
+    def store(self, key, extension, source):
+        # Copy to a temporary name first so other Fusion sessions never see
+        # a partly written file.
+        cached = self._path(key, extension)
+        try:
+            os.makedirs(os.path.dirname(cached), exist_ok=True)
+            temporary = '{}.{}.tmp'.format(cached, os.getpid())
+            copyfile(source, temporary)
+            os.replace(temporary, cached)
+        except OSError:
+            pass
+
+    def trim(self):
+        # Remove the least recently used files until the cache fits its cap.
+        # Returns the number of files removed.
+        entries = []
+        total = 0
+        for folder, _, files in os.walk(self.directory):
+            for fileName in files:
+                path = os.path.join(folder, fileName)
+                try:
+                    info = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((info.st_mtime, info.st_size, path))
+                total += info.st_size
+        removed = 0
+        for mtime, size, path in sorted(entries):
+            if total <= self.maxBytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+# Export formats: file extension and a function creating the export options.
+# Fusion takes the arguments of the STEP options in a different order.
+exportTargets = {
+    'step': ('.stp', lambda manager, filename, component: manager.createSTEPExportOptions(filename, component)),
+    'stl': ('.stl', lambda manager, filename, component: manager.createSTLExportOptions(component, filename)),
+    '3mf': ('.3mf', lambda manager, filename, component: manager.createC3MFExportOptions(component, filename)),
+}
+
+class ExportQueue:
+    # Collects the unique components to export while the design is traversed
+    # and exports them afterwards in one batch, in every requested format.
+    # Components are keyed by their persistent id because Fusion hands out a
+    # new proxy object on every access. Files recorded in the checkpoint by
+    # an earlier run for the same checkpointKey are kept.
+    def __init__(self, formats, cache=None, checkpoint=None):
+        self.formats = formats
+        self.cache = cache
+        self.checkpoint = checkpoint
+        self.results = []
+        self._components = {}
+
+    def __len__(self):
+        return len(self._components)
+
+    def add(self, component, fileBase, sourceKey=None, checkpointKey=None):
+        # fileBase is the planned output path without an extension.
+        key = component.id
+        if key not in self._components:
+            self._components[key] = (component, fileBase, sourceKey, checkpointKey or key)
+
+    def run(self, onBatch=None):
+        # Export everything, timing each item; a failed export is recorded
+        # and the rest of the batch carries on. onBatch is called with the
+        # number of components done after every exportBatchSize components.
+        # Returns the failure messages.
+        failures = []
+        checkpoint = self.checkpoint
+        for number, (component, fileBase, sourceKey, checkpointKey) in enumerate(self._components.values(), 1):
+            exportManager = component.parentDesign.exportManager
+            for exportFormat in self.formats:
+                extension, createOptions = exportTargets[exportFormat]
+                filename = fileBase + extension
+                if checkpoint and checkpoint.isDone(filename, checkpointKey):
+                    continue
+                start = time.perf_counter()
+                cacheKey = self.cache.key(sourceKey, exportFormat) if self.cache and sourceKey else None
+                with tracer.span('export', component=component.name, format=exportFormat, path=filename) as span:
+                    cached = bool(cacheKey) and self.cache.fetch(cacheKey, extension, filename)
+                    span.args['cached'] = cached
+                    error = None
+                    if not cached:
+                        try:
+                            unlinkOutput(filename)
+                            options = createOptions(exportManager, filename, component)
+                            if not exportManager.execute(options):
+                                raise RuntimeError('export was not completed')
+                            if cacheKey:
+                                self.cache.store(cacheKey, extension, filename)
+                        except Exception as exc:
+                            error = '{}: {}'.format(type(exc).__name__, exc)
+                            span.args['error'] = error
+                            failures.append('{} ({}): {}'.format(component.name, exportFormat, error))
+                    if checkpoint and error is None:
+                        checkpoint.add(filename, checkpointKey)
+                self.results.append((component.name, exportFormat, filename, time.perf_counter() - start, error))
+            if onBatch and (number % exportBatchSize == 0 or number == len(self._components)):
+                onBatch(number)
+        self._components = {}
+        return failures
+
+class OutputPlan:
+    # Plans every output file of an extraction before anything is written.
+    # Names are sanitized once per component name, files that would get the
+    # same name in a folder are numbered instead of overwriting each other,
+    # and the folders are created together once the plan is complete.
+    def __init__(self):
+        self._names = {}
+        self._fileBases = set()
+        self._directories = set()
+
+    def name(self, componentName):
+        sanitized = self._names.get(componentName)
+        if sanitized is None:
+            sanitized = self._names[componentName] = name(componentName)
+        return sanitized
+
+    def file(self, directory, componentName, extension=''):
+        # Reserves a collision-safe file in the folder and returns its path.
+        # Names are compared case-insensitively as Windows and macOS do.
+        baseName = directory + '/' + self.name(componentName)
+        fileBase = baseName
+        number = 1
+        while fileBase.lower() in self._fileBases:
+            number += 1
+            fileBase = '{}_{}'.format(baseName, number)
+        self._fileBases.add(fileBase.lower())
+        self._directories.add(directory)
+        return fileBase + extension
+
+    def makeDirectories(self):
+        # Creates the planned folders, deepest first so that makedirs creates
+        # their parents and folders holding a planned folder are skipped.
+        # Returns the number of makedirs calls.
+        created = set()
+        calls = 0
+        for directory in sorted(self._directories, reverse=True):
+            if directory in created:
+                continue
+            os.makedirs(directory, exist_ok=True)
+            calls += 1
+            while directory and directory not in created:
+                created.add(directory)
+                directory = os.path.dirname(directory)
+        return calls
+
+# Extraction runs in chunks; between them progress is reported, Cancel is
+# handled and the checkpoint is written.
+traversalBatchSize = 500
+captureBatchSize = 25
+exportBatchSize = 10
+propertyBatchSize = 25
+
+class ExtractionCancelled(Exception):
+    pass
+
+class Progress:
+    # Fusion's progress dialog, shown once and reused for every phase of an
+    # extraction. update() lets Fusion process events, which repaints the
+    # dialog and handles its Cancel button, and raises ExtractionCancelled
+    # once Cancel was pressed.
+    def __init__(self, title):
+        self.title = title
+        self._dialog = None
+
+    def start(self, message, maximum):
+        # The message may use %v for the value and %m for the maximum; a
+        # maximum of 0 shows a busy indicator.
+        if self._dialog is None:
+            self._dialog = ui.createProgressDialog()
+            self._dialog.isCancelButtonShown = True
+            self._dialog.show(self.title, message, 0, maximum, 0)
+        else:
+            self._dialog.message = message
+            self._dialog.maximumValue = maximum
+        self.update(0)
+
+    def update(self, value):
+        self._dialog.progressValue = value
+        adsk.doEvents()
+        if self._dialog.wasCancelled:
+            raise ExtractionCancelled()
+
+    def hide(self):
+        if self._dialog is not None:
+            self._dialog.hide()
+            self._dialog = None
+
+class Checkpoint:
+    # Records the thumbnails and exports an extraction has written so that a
+    # cancelled or crashed run to the same file resumes instead of starting
+    # over. The file holds a settings line and then one JSON line per output
+    # file with the id and version of its component, appended after every
+    # batch, so files of components edited since are made again.
+    def __init__(self, filename, settings):
+        self.filename = filename
+        self.settings = settings
+        self._done = {}
+        self._pending = []
+        self._file = None
+
+    def open(self):
+        # Loads the files recorded by an earlier run with the same settings,
+        # ignoring a partly written last line, and returns their number.
+        self._done = {}
+        try:
+            with open(self.filename, encoding='utf-8') as checkpointFile:
+                if json.loads(checkpointFile.readline()) == self.settings:
+                    for line in checkpointFile:
+                        try:
+                            path, checkpointKey = json.loads(line)
+                        except ValueError:
+                            break
+                        self._done[path] = checkpointKey
+        except (OSError, ValueError):
+            pass
+        # Start a clean file holding what was loaded.
+        self._file = open(self.filename, 'w', encoding='utf-8')
+        self._file.write(json.dumps(self.settings) + '\n')
+        self._pending = list(self._done.items())
+        self.save()
+        return len(self._done)
+
+    def keep(self, path, checkpointKey):
+        # Counts an existing file, such as one from a previous run, as done.
+        self._done[path] = checkpointKey
+
+    def isDone(self, path, checkpointKey):
+        return self._done.get(path) == checkpointKey and os.path.exists(path)
+
+    def add(self, path, checkpointKey):
+        self._pending.append((path, checkpointKey))
+
+    def save(self):
+        if self._pending:
+            self._file.write(''.join(json.dumps(entry) + '\n' for entry in self._pending))
+            self._pending = []
+        self._file.flush()
+
+    def close(self, remove=False):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if remove and os.path.exists(self.filename):
+            os.remove(self.filename)
 
 def take(*path):
     out_path = os.path.join(*path)
@@ -394,32 +1449,8 @@ def name(name):
 
     return name
 
-def buildXLSX(bom, fileName, projectInfo):
-    copyfile(addin_path + '/resources/logo.png', projectInfo['logoImage'])
-
-    workbook = xlsxwriter.Workbook(fileName + '.xlsx')
-
-    #define common formatting
-    #title formatting
-    title_format = workbook.add_format()
-    title_format.set_bold()
-    title_format.set_align('center')
-    title_format.set_align('vcenter')
-
-    #header formatting
-    header_format = workbook.add_format()
-    header_format.set_bg_color('#5599ff')
-    header_format.set_bold()
-    header_format.set_size(12)
-    header_format.set_align('center')
-    header_format.set_align('vcenter')
-
-    #bom formatting
-    bom_format = workbook.add_format()
-    bom_format.set_align('center')
-    bom_format.set_align('vcenter')
-        
-    #Build Project Summary Sheet
+def buildProjectSheet(workbook, projectValues):
+    # Builds the Project cover sheet; later workbooks copy it from a template.
     project_worksheet = workbook.add_worksheet('Project')
     
     projectKey_format = workbook.add_format()
@@ -441,19 +1472,19 @@ def buildXLSX(bom, fileName, projectInfo):
     #project info
     
     project_worksheet.merge_range("C3:D3",'Project Name', projectKey_format)
-    project_worksheet.merge_range("E3:J3", projectInfo['projectName'], projectValue_format)
+    project_worksheet.merge_range("E3:J3", projectValues['projectName'], projectValue_format)
     
     project_worksheet.merge_range("C4:D4",'Product Name', projectKey_format)
-    project_worksheet.merge_range("E4:J4", projectInfo['productName'], projectValue_format)
+    project_worksheet.merge_range("E4:J4", projectValues['productName'], projectValue_format)
     
     project_worksheet.merge_range("C5:D5",'Owner', projectKey_format)    
-    project_worksheet.merge_range("E5:J5", projectInfo['owner'], projectValue_format)
+    project_worksheet.merge_range("E5:J5", projectValues['owner'], projectValue_format)
 
     project_worksheet.merge_range("C6:D6",'Designer', projectKey_format)
-    project_worksheet.merge_range("E6:J6", projectInfo['designer'], projectValue_format)
+    project_worksheet.merge_range("E6:J6", projectValues['designer'], projectValue_format)
 
     project_worksheet.merge_range("C7:D7",'Completion Date', projectKey_format)    
-    project_worksheet.merge_range("E7:J7", date.today().strftime("%B %d, %Y"), projectValue_format)
+    project_worksheet.merge_range("E7:J7", projectValues['completionDate'], projectValue_format)
 
     #quote
     project_worksheet.merge_range("C9:D9", 'Quote', projectKey_format)    
@@ -546,11 +1577,61 @@ def buildXLSX(bom, fileName, projectInfo):
 
     #logo    
     project_worksheet.merge_range("C29:N38",'', projectKey_format)
-    project_worksheet.insert_image("C29", projectInfo['logoImage'], {'x_offset': 15, 'y_offset': 15, 'x_scale': 3, 'y_scale': 3})
 
     #assembly image
     project_worksheet.merge_range("P3:U38",'', projectKey_format)
-    project_worksheet.insert_image("P3", projectInfo['rootImage'], {'x_offset': 5, 'y_offset': 5})
+
+    return project_worksheet
+
+def buildXLSX(bom, fileName, projectInfo, thumbnails=True, hierarchy=None, indented=False, subassemblies=False, changes=None):
+    global projectTemplate
+    os.makedirs(os.path.dirname(projectInfo['logoImage']), exist_ok=True)
+    copyfile(addin_path + '/resources/logo.png', projectInfo['logoImage'])
+
+    workbook = xlsxwriter.Workbook(fileName + '.xlsx')
+
+    #define common formatting
+    #title formatting
+    title_format = workbook.add_format()
+    title_format.set_bold()
+    title_format.set_align('center')
+    title_format.set_align('vcenter')
+
+    #header formatting
+    header_format = workbook.add_format()
+    header_format.set_bg_color('#5599ff')
+    header_format.set_bold()
+    header_format.set_size(12)
+    header_format.set_align('center')
+    header_format.set_align('vcenter')
+
+    #bom formatting
+    bom_format = workbook.add_format()
+    bom_format.set_align('center')
+    bom_format.set_align('vcenter')
+        
+    #Build Project Summary Sheet
+    # The cover sheet only differs by its placeholder values, so after the first
+    # workbook it is copied from a template instead of being rebuilt.
+    projectValues = {
+        'projectName': projectInfo['projectName'],
+        'productName': projectInfo['productName'],
+        'owner': projectInfo['owner'],
+        'designer': projectInfo['designer'],
+        'completionDate': date.today().strftime("%B %d, %Y"),
+    }
+    if projectTemplate is None:
+        project_worksheet = buildProjectSheet(workbook, projectValues)
+        projectTemplate = workbook.capture_template(project_worksheet, projectPlaceholders)
+    else:
+        project_worksheet = workbook.add_worksheet_from_template(projectTemplate, values=projectValues)
+
+    #logo
+    project_worksheet.insert_image("C29", projectInfo['logoImage'], {'x_offset': 15, 'y_offset': 15, 'x_scale': 3, 'y_scale': 3})
+
+    #assembly image
+    if projectInfo['rootImage']:
+        project_worksheet.insert_image("P3", projectInfo['rootImage'], {'x_offset': 5, 'y_offset': 5})
 
     #Build BOM Sheet
     headerColumns = [
@@ -562,9 +1643,21 @@ def buildXLSX(bom, fileName, projectInfo):
         'Finish',
         'Notes'
     ]
+    if not thumbnails:
+        headerColumns.remove('Thumbnail')
+    # Physical properties follow the material; the total mass of each line
+    # and of the BOM are formulas so they follow edits to the quantities.
+    physical = any(item.physical is not None for item in bom)
+    if physical:
+        at = headerColumns.index('Material') + 1
+        headerColumns[at:at] = [physicalColumns[0][0], 'Total Mass (kg)'] + [heading for heading, numberFormat in physicalColumns[1:]]
+        quantityCol = headerColumns.index('Quantity')
+        massCol = at
+        physicalFormats = [workbook.add_format({'align': 'center', 'valign': 'vcenter', 'num_format': numberFormat})
+                           for heading, numberFormat in physicalColumns]
 
     bom_worksheet = workbook.add_worksheet('BOM')
-    bom_worksheet.merge_range(0,0,0,6,'Primary Bill of Materials', title_format)
+    bom_worksheet.merge_range(0,0,0,len(headerColumns)-1,'Primary Bill of Materials', title_format)
     bom_worksheet.set_row_pixels(0, 40)
     hcol = 0
     for header in headerColumns:
@@ -577,20 +1670,218 @@ def buildXLSX(bom, fileName, projectInfo):
         #write part number as row number minus one (header)
         bom_worksheet.write(row, 0, row-1, header_format)
         col = 1
-        for prop in item:
-            if prop is 'thumbnail':
-                bom_worksheet.set_column_pixels(col, col, 156)
-                bom_worksheet.set_row_pixels(row, 156)
-                bom_worksheet.insert_image(row, col, item[prop], {"x_offset": 3, "y_offset": 3, 'x_scale': 0.5, 'y_scale': 0.5})
-                col += 1
-            elif isinstance(item[prop], str) or isinstance(item[prop], int):
-                bom_worksheet.write(row, col, item[prop], bom_format)
-                col += 1
+        if item.thumbnail is not None:
+            bom_worksheet.set_column_pixels(col, col, 156)
+            bom_worksheet.set_row_pixels(row, 156)
+            bom_worksheet.insert_image(row, col, item.thumbnail, {"x_offset": 3, "y_offset": 3, 'x_scale': 0.5, 'y_scale': 0.5})
+            col += 1
+        bom_worksheet.write_row(row, col, item.values(), bom_format)
+        if item.physical is not None:
+            values = item.physical
+            bom_worksheet.write_number(row, massCol, values[0], physicalFormats[0])
+            bom_worksheet.write_formula(row, massCol + 1, '={}*{}'.format(
+                xl_rowcol_to_cell(row, quantityCol), xl_rowcol_to_cell(row, massCol)), physicalFormats[0])
+            for index in range(1, len(values)):
+                bom_worksheet.write_number(row, massCol + 1 + index, values[index], physicalFormats[index])
         row += 1
+    if physical:
+        bom_worksheet.write(row, massCol, 'Total', header_format)
+        bom_worksheet.write_formula(row, massCol + 1, '=SUM({}:{})'.format(
+            xl_rowcol_to_cell(2, massCol + 1), xl_rowcol_to_cell(row - 1, massCol + 1)), physicalFormats[0])
     bom_worksheet.autofit()
 
+    if changes is not None:
+        buildChangesSheet(workbook, changes[0], changes[1], title_format, header_format)
+
+    if hierarchy is not None and indented:
+        buildIndentedSheet(workbook, hierarchy, thumbnails, title_format, header_format, bom_format)
+
+    if hierarchy is not None and subassemblies:
+        sheetNames = set(['project', 'bom', 'changes', 'indented bom'])
+        done = set()
+        for level, itemNumber, node, quantity in hierarchy.walk():
+            if node.children and node not in done:
+                done.add(node)
+                sheetName = uniqueSheetName(node.name, sheetNames)
+                buildSubassemblySheet(workbook, sheetName, node, thumbnails, title_format, header_format, bom_format)
+
     workbook.close()
 
+# Highlighting of the Changes sheet by kind of change.
+changeColors = {
+    'Added': '#C6EFCE',
+    'Removed': '#FFC7CE',
+    'Changed': '#FFEB9C',
+}
+
+def buildChangesSheet(workbook, since, changes, title_format, header_format):
+    # Lines added, removed or changed since the previous run to this file.
+    headerColumns = ['Change', 'Part Name', 'Previous Quantity', 'Quantity', 'Material', 'Details']
+    worksheet = workbook.add_worksheet('Changes')
+    worksheet.merge_range(0, 0, 0, len(headerColumns) - 1, 'Changes since ' + since, title_format)
+    worksheet.set_row_pixels(0, 40)
+    for hcol, header in enumerate(headerColumns):
+        worksheet.set_column_pixels(hcol, hcol, 100)
+        worksheet.write(1, hcol, header, header_format)
+    worksheet.set_row_pixels(1, 40)
+    formats = {}
+    for change, color in changeColors.items():
+        formats[change] = workbook.add_format({'align': 'center', 'valign': 'vcenter', 'bg_color': color})
+    for row, line in enumerate(changes, 2):
+        worksheet.write_row(row, 0, line, formats[line[0]])
+    if not changes:
+        worksheet.write(2, 0, 'No changes')
+    worksheet.autofit()
+
+def uniqueSheetName(baseName, sheetNames):
+    # Excel sheet names are unique (ignoring case) and at most 31 characters.
+    # The component name is already stripped of characters Excel rejects.
+    baseName = (baseName or 'Subassembly')[:31]
+    sheetName = baseName
+    number = 1
+    while sheetName.lower() in sheetNames:
+        number += 1
+        suffix = ' ({})'.format(number)
+        sheetName = baseName[:31 - len(suffix)] + suffix
+    sheetNames.add(sheetName.lower())
+    return sheetName
+
+def writeBOMLines(worksheet, lines, headerColumns, thumbnails, header_format, bom_format, indentFormats=None):
+    # Writes (first cell, node, quantity) lines below the header rows of an
+    # indented or subassembly sheet. The node's captured thumbnail is reused.
+    if not thumbnails:
+        headerColumns = [header for header in headerColumns if header != 'Thumbnail']
+    worksheet.set_row_pixels(0, 40)
+    for hcol, header in enumerate(headerColumns):
+        worksheet.set_column_pixels(hcol, hcol, 100)
+        worksheet.write(1, hcol, header, header_format)
+    worksheet.set_row_pixels(1, 40)
+    row = 2
+    for first, level, node, quantity in lines:
+        worksheet.write(row, 0, first, header_format)
+        col = 1
+        if thumbnails and node.thumbnail:
+            worksheet.set_column_pixels(col, col, 156)
+            worksheet.set_row_pixels(row, 156)
+            worksheet.insert_image(row, col, node.thumbnail, {"x_offset": 3, "y_offset": 3, 'x_scale': 0.5, 'y_scale': 0.5})
+        if thumbnails:
+            col += 1
+        nameFormat = indentFormats(level) if indentFormats else bom_format
+        material = node.row.material if node.row is not None else ''
+        worksheet.write(row, col, node.name, nameFormat)
+        worksheet.write_row(row, col + 1, [quantity, material], bom_format)
+        row += 1
+    worksheet.autofit()
+
+def buildIndentedSheet(workbook, hierarchy, thumbnails, title_format, header_format, bom_format):
+    # Multi-level BOM: every component under its parent with the quantity
+    # per parent, part names indented by level.
+    headerColumns = ['Item', 'Thumbnail', 'Part Name', 'Quantity', 'Material']
+    worksheet = workbook.add_worksheet('Indented BOM')
+    worksheet.merge_range(0, 0, 0, len(headerColumns) - (1 if thumbnails else 2), 'Indented Bill of Materials', title_format)
+
+    formats = {}
+    def indentFormat(level):
+        if level not in formats:
+            formats[level] = workbook.add_format({'align': 'left', 'valign': 'vcenter', 'indent': min(level - 1, 15)})
+        return formats[level]
+
+    lines = [(itemNumber, level, node, quantity) for level, itemNumber, node, quantity in hierarchy.walk()]
+    writeBOMLines(worksheet, lines, headerColumns, thumbnails, header_format, bom_format, indentFormat)
+
+def buildSubassemblySheet(workbook, sheetName, node, thumbnails, title_format, header_format, bom_format):
+    # BOM of one subassembly: its direct children and their quantities.
+    headerColumns = ['Part Number', 'Thumbnail', 'Part Name', 'Quantity', 'Material']
+    worksheet = workbook.add_worksheet(sheetName)
+    worksheet.merge_range(0, 0, 0, len(headerColumns) - (1 if thumbnails else 2), node.name, title_format)
+    lines = [(number, 1, child, quantity) for number, (child, quantity) in enumerate(node.children.items(), 1)]
+    writeBOMLines(worksheet, lines, headerColumns, thumbnails, header_format, bom_format)
+
+# Columns of the CSV and JSON files: heading and BOMRow field.
+dataColumns = [
+    ('Part Number', None),
+    ('Part Name', 'name'),
+    ('Quantity', 'instances'),
+    ('Material', 'material'),
+    ('Thumbnail', 'thumbnail'),
+]
+
+# Physical property columns: heading and number format, in the order of
+# BOMRow.physical.
+physicalColumns = [
+    ('Mass (kg)', '0.000'),
+    ('Volume (cm\u00b3)', '0.00'),
+    ('Area (cm\u00b2)', '0.00'),
+    ('Size X (mm)', '0.0'),
+    ('Size Y (mm)', '0.0'),
+    ('Size Z (mm)', '0.0'),
+]
+
+def writeBOMData(bom, fileName, writeCSV, writeJSON):
+    # Writes the BOM rows as plain data next to the workbook.
+    columns = [column for column in dataColumns if column[1] is None or any(getattr(item, column[1]) is not None for item in bom)]
+    headings = [heading for heading, key in columns]
+    rows = []
+    for number, item in enumerate(bom, 1):
+        rows.append([number if key is None else getattr(item, key) for heading, key in columns])
+
+    if any(item.physical is not None for item in bom):
+        headings += [heading for heading, numberFormat in physicalColumns]
+        for values, item in zip(rows, bom):
+            values.extend(item.physical or [None] * len(physicalColumns))
+
+    if writeCSV:
+        with open(fileName + '.csv', 'w', newline='', encoding='utf-8') as csvFile:
+            writer = csv.writer(csvFile)
+            writer.writerow(headings)
+            writer.writerows(rows)
+
+    if writeJSON:
+        with open(fileName + '.json', 'w', encoding='utf-8') as jsonFile:
+            json.dump([dict(zip(headings, row)) for row in rows], jsonFile, indent=1)
+
+# Batch extraction summary, one row per design.
+batchSummaryName = 'BOMshot batch summary.csv'
+batchSummaryColumns = ['Design', 'Workbook', 'Status', 'Components', 'Traversal (s)',
+                       'Capture (s)', 'Exports (s)', 'Physical Properties (s)', 'Workbook (s)', 'Total (s)']
+
+def designFiles(folder):
+    # The Fusion design files in a project folder and its subfolders.
+    files = [dataFile for dataFile in folder.dataFiles if dataFile.fileExtension == 'f3d']
+    for subfolder in folder.dataFolders:
+        files.extend(designFiles(subfolder))
+    return files
+
+def openDesign(item):
+    # Makes a design, or the design in a data file, the active one. Returns
+    # the design and the document to close afterwards, which is None if it
+    # was open already.
+    dataFile = adsk.core.DataFile.cast(item)
+    if dataFile is None:
+        design = adsk.fusion.Design.cast(item)
+        if design is not None:
+            design.parentDocument.activate()
+        return design, None
+
+    document = None
+    for openDocument in app.documents:
+        if openDocument.dataFile and openDocument.dataFile.id == dataFile.id:
+            document = openDocument
+            document.activate()
+            break
+    opened = document is None
+    if opened:
+        document = app.documents.open(dataFile)
+    design = adsk.fusion.Design.cast(document.products.itemByProductType('DesignProductType'))
+    return design, document if opened else None
+
+def writeBatchSummary(summary, fileName):
+    with open(fileName, 'w', newline='', encoding='utf-8') as csvFile:
+        writer = csv.writer(csvFile)
+        writer.writerow(batchSummaryColumns)
+        for row in summary:
+            writer.writerow(row[:4] + [round(seconds, 3) for seconds in row[4:]])
+
 def isGridDisplayOn():
     app = adsk.core.Application.get()
     ui  = app.userInterface
@@ -17,6 +17,11 @@ from .utility import xl_range_formula
 from .utility import supported_datetime
 from .utility import datetime_to_excel_datetime
 from .utility import quote_sheetname
+from .utility import downsample_lttb
+from .utility import downsample_min_max
+
+# Number of <c:pt> elements joined into a single write for cached data.
+PT_RUN_SIZE = 4096
 
 
 class Chart(xmlwriter.XMLwriter):
@@ -88,6 +93,7 @@ class Chart(xmlwriter.XMLwriter):
         self.hi_low_lines = None
         self.up_down_bars = None
         self.smooth_allowed = False
+        self.xy_series = False
         self.title_font = None
         self.title_name = None
         self.title_formula = None
@@ -185,6 +191,9 @@ class Chart(xmlwriter.XMLwriter):
         # Set the line smooth property for the series.
         smooth = options.get("smooth")
 
+        # Set the downsampling of the cached data for long series.
+        downsample = self._get_downsample_properties(options.get("downsample"))
+
         # Set the error bars properties for the series.
         y_error_bars = self._get_error_bars_props(options.get("y_error_bars"))
         x_error_bars = self._get_error_bars_props(options.get("x_error_bars"))
@@ -246,6 +255,7 @@ class Chart(xmlwriter.XMLwriter):
             "points": points,
             "error_bars": error_bars,
             "smooth": smooth,
+            "downsample": downsample,
         }
 
         self.series.append(series)
@@ -1183,6 +1193,88 @@ class Chart(xmlwriter.XMLwriter):
 
         return gridline
 
+    def _get_downsample_properties(self, downsample):
+        # Convert user downsample properties to the structure required
+        # internally. An int is shorthand for {"points": int}.
+
+        if not downsample:
+            return
+
+        if not isinstance(downsample, dict):
+            downsample = {"points": downsample}
+
+        methods = ("lttb", "min_max")
+        method = downsample.get("method", "lttb")
+
+        if method not in methods:
+            warn("Unknown downsample method '%s'" % method)
+            return
+
+        points = downsample.get("points")
+
+        if not isinstance(points, int) or points < 3:
+            warn("Downsample 'points' must be an integer >= 3")
+            return
+
+        return {"points": points, "method": method}
+
+    def _get_sample_indices(self, series):
+        # Get the set of point indices kept in the cached data of a
+        # downsampled series, or None to keep every point. The series
+        # formulas are unchanged so Excel still plots the full range once
+        # it recalculates. The indices are shared by the values and the
+        # categories so that points stay paired.
+        downsample = series.get("downsample")
+
+        if not downsample:
+            return None
+
+        if "sample_indices" in series:
+            return series["sample_indices"]
+
+        indices = None
+        points = downsample["points"]
+        y_data = self.formula_data[series["val_data_id"]]
+
+        # Scatter style charts sample against the numeric x values, others
+        # against the point index.
+        x_data = None
+        if self.xy_series and series["cat_data_id"] is not None:
+            x_data = self.formula_data[series["cat_data_id"]]
+            if self._get_data_type(x_data) != "num":
+                x_data = None
+
+        if y_data and len(y_data) > points:
+            positions = []
+            x_values = []
+            y_values = []
+            x_tokens = iter(x_data) if x_data is not None else None
+
+            for i, y in enumerate(y_data):
+                x = next(x_tokens, None) if x_tokens is not None else i
+
+                # Points without a numeric value aren't plotted or kept.
+                try:
+                    x = float(x)
+                    y = float(y)
+                except (TypeError, ValueError):
+                    continue
+
+                positions.append(i)
+                x_values.append(x)
+                y_values.append(y)
+
+            if downsample["method"] == "lttb":
+                selected = downsample_lttb(x_values, y_values, points)
+            else:
+                selected = downsample_min_max(y_values, points)
+
+            indices = set(positions[i] for i in selected)
+
+        series["sample_indices"] = indices
+
+        return indices
+
     def _get_labels_properties(self, labels):
         # Convert user labels properties to the structure required internally.
 
@@ -1983,10 +2075,13 @@ class Chart(xmlwriter.XMLwriter):
         # Check the type of cached data.
         cat_type = self._get_data_type(data)
 
+        # Get the points kept in the cache of a downsampled series.
+        indices = self._get_sample_indices(series)
+
         if cat_type == "str":
             self.cat_has_num_fmt = 0
             # Write the c:numRef element.
-            self._write_str_ref(formula, data, cat_type)
+            self._write_str_ref(formula, data, cat_type, indices)
 
         elif cat_type == "multi_str":
             self.cat_has_num_fmt = 0
@@ -1996,7 +2091,7 @@ class Chart(xmlwriter.XMLwriter):
         else:
             self.cat_has_num_fmt = 1
             # Write the c:numRef element.
-            self._write_num_ref(formula, data, cat_type)
+            self._write_num_ref(formula, data, cat_type, indices)
 
         self._xml_end_tag("c:cat")
 
@@ -2008,13 +2103,16 @@ class Chart(xmlwriter.XMLwriter):
 
         self._xml_start_tag("c:val")
 
+        # Get the points kept in the cache of a downsampled series.
+        indices = self._get_sample_indices(series)
+
         # Unlike Cat axes data should only be numeric.
         # Write the c:numRef element.
-        self._write_num_ref(formula, data, "num")
+        self._write_num_ref(formula, data, "num", indices)
 
         self._xml_end_tag("c:val")
 
-    def _write_num_ref(self, formula, data, ref_type):
+    def _write_num_ref(self, formula, data, ref_type, indices=None):
         # Write the <c:numRef> element.
         self._xml_start_tag("c:numRef")
 
@@ -2023,14 +2121,14 @@ class Chart(xmlwriter.XMLwriter):
 
         if ref_type == "num":
             # Write the c:numCache element.
-            self._write_num_cache(data)
+            self._write_num_cache(data, indices)
         elif ref_type == "str":
             # Write the c:strCache element.
-            self._write_str_cache(data)
+            self._write_str_cache(data, indices)
 
         self._xml_end_tag("c:numRef")
 
-    def _write_str_ref(self, formula, data, ref_type):
+    def _write_str_ref(self, formula, data, ref_type, indices=None):
         # Write the <c:strRef> element.
 
         self._xml_start_tag("c:strRef")
@@ -2040,10 +2138,10 @@ class Chart(xmlwriter.XMLwriter):
 
         if ref_type == "num":
             # Write the c:numCache element.
-            self._write_num_cache(data)
+            self._write_num_cache(data, indices)
         elif ref_type == "str":
             # Write the c:strCache element.
-            self._write_str_cache(data)
+            self._write_str_cache(data, indices)
 
         self._xml_end_tag("c:strRef")
 
@@ -3595,7 +3693,7 @@ class Chart(xmlwriter.XMLwriter):
 
         self._xml_empty_tag("c:overlap", attributes)
 
-    def _write_num_cache(self, data):
+    def _write_num_cache(self, data, indices=None):
         # Write the <c:numCache> element.
         if data:
             count = len(data)
@@ -3610,10 +3708,35 @@ class Chart(xmlwriter.XMLwriter):
         # Write the c:ptCount element.
         self._write_pt_count(count)
 
-        for i in range(count):
-            token = data[i]
+        if count:
+            self._write_num_pts(data, indices)
 
-            if token is None:
+        self._xml_end_tag("c:numCache")
+
+    def _write_str_cache(self, data, indices=None):
+        # Write the <c:strCache> element.
+        count = len(data)
+
+        self._xml_start_tag("c:strCache")
+
+        # Write the c:ptCount element.
+        self._write_pt_count(count)
+
+        if count:
+            self._write_str_pts(data, indices)
+
+        self._xml_end_tag("c:strCache")
+
+    def _write_num_pts(self, data, indices=None):
+        # Write the <c:pt> elements of a numCache in bulk. This is the
+        # equivalent of calling _write_pt() for each point but the points
+        # are streamed from the data and written in runs. If indices is
+        # given only those points are written.
+        write = self.fh.write
+        run = []
+
+        for i, token in enumerate(data):
+            if token is None or (indices is not None and i not in indices):
                 continue
 
             try:
@@ -3622,25 +3745,34 @@ class Chart(xmlwriter.XMLwriter):
                 # Write non-numeric data as 0.
                 token = 0
 
-            # Write the c:pt element.
-            self._write_pt(i, token)
+            # Numeric strings never contain characters that need escaping.
+            run.append('<c:pt idx="%d"><c:v>%s</c:v></c:pt>' % (i, token))
 
-        self._xml_end_tag("c:numCache")
+            if len(run) >= PT_RUN_SIZE:
+                write("".join(run))
+                run = []
 
-    def _write_str_cache(self, data):
-        # Write the <c:strCache> element.
-        count = len(data)
+        if run:
+            write("".join(run))
 
-        self._xml_start_tag("c:strCache")
+    def _write_str_pts(self, data, indices=None):
+        # Write the <c:pt> elements of a strCache in bulk, as above.
+        write = self.fh.write
+        escape_data = self._escape_data
+        run = []
 
-        # Write the c:ptCount element.
-        self._write_pt_count(count)
+        for i, token in enumerate(data):
+            if token is None or (indices is not None and i not in indices):
+                continue
 
-        for i in range(count):
-            # Write the c:pt element.
-            self._write_pt(i, data[i])
+            run.append('<c:pt idx="%d"><c:v>%s</c:v></c:pt>' % (i, escape_data(token)))
 
-        self._xml_end_tag("c:strCache")
+            if len(run) >= PT_RUN_SIZE:
+                write("".join(run))
+                run = []
+
+        if run:
+            write("".join(run))
 
     def _write_format_code(self, data):
         # Write the <c:formatCode> element.
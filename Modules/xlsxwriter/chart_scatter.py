@@ -43,6 +43,7 @@ class ChartScatter(chart.Chart):
         self.val_axis_position = "b"
         self.smooth_allowed = True
         self.requires_category = True
+        self.xy_series = True
 
         # Set the available data label positions for this chart type.
         self.label_position_default = "right"
@@ -268,12 +269,15 @@ class ChartScatter(chart.Chart):
         # Check the type of cached data.
         data_type = self._get_data_type(data)
 
+        # Get the points kept in the cache of a downsampled series.
+        indices = self._get_sample_indices(series)
+
         if data_type == "str":
             # Write the c:numRef element.
-            self._write_str_ref(formula, data, data_type)
+            self._write_str_ref(formula, data, data_type, indices)
         else:
             # Write the c:numRef element.
-            self._write_num_ref(formula, data, data_type)
+            self._write_num_ref(formula, data, data_type, indices)
 
         self._xml_end_tag("c:xVal")
 
@@ -285,9 +289,12 @@ class ChartScatter(chart.Chart):
 
         self._xml_start_tag("c:yVal")
 
+        # Get the points kept in the cache of a downsampled series.
+        indices = self._get_sample_indices(series)
+
         # Unlike Cat axes data should only be numeric.
         # Write the c:numRef element.
-        self._write_num_ref(formula, data, "num")
+        self._write_num_ref(formula, data, "num", indices)
 
         self._xml_end_tag("c:yVal")
 
@@ -8,12 +8,14 @@
 
 # Standard packages.
 import os
+import pickle
 import stat
 import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from shutil import copy
+from zipfile import ZipInfo
 
 from io import StringIO
-from io import BytesIO
 
 # Package imports.
 from .app import App
@@ -89,6 +91,7 @@ class Packager(object):
 
         self.tmpdir = ""
         self.in_memory = False
+        self.worker_processes = 0
         self.workbook = None
         self.worksheet_count = 0
         self.chartsheet_count = 0
@@ -99,6 +102,8 @@ class Packager(object):
         self.num_comment_files = 0
         self.named_ranges = []
         self.filenames = []
+        self.zip_file = None
+        self.zip_part = None
 
     ###########################################################################
     #
@@ -114,6 +119,14 @@ class Packager(object):
         # Set the optional 'in_memory' mode.
         self.in_memory = in_memory
 
+    def _set_zip_file(self, zip_file):
+        # Set the zip file that the parts are written to in 'in_memory' mode.
+        self.zip_file = zip_file
+
+    def _set_worker_processes(self, worker_processes):
+        # Set the optional number of processes used to write worksheets.
+        self.worker_processes = worker_processes
+
     def _add_workbook(self, workbook):
         # Add the Excel::Writer::XLSX::Workbook object to the package.
         self.workbook = workbook
@@ -156,14 +169,20 @@ class Packager(object):
         self._write_core_file()
         self._write_app_file()
         self._write_metadata_file()
+        self._close_zip_part()
 
         return self.filenames
 
     def _filename(self, xml_filename):
         # Create a temp filename to write the XML data to and store the Excel
-        # filename to use as the name in the Zip container.
+        # filename to use as the name in the Zip container. In 'in_memory'
+        # mode the XML data is written straight into the Zip container
+        # instead. The parts are written one at a time so the previous part
+        # is complete at this point.
         if self.in_memory:
-            os_filename = StringIO()
+            self._close_zip_part()
+            self.zip_part = ZipPartWriter(self.zip_file, xml_filename)
+            return self.zip_part
         else:
             (fd, os_filename) = tempfile.mkstemp(dir=self.tmpdir)
             os.close(fd)
@@ -172,6 +191,18 @@ class Packager(object):
 
         return os_filename
 
+    def _close_zip_part(self):
+        # Finish the Zip container entry of the current 'in_memory' part.
+        if self.zip_part is not None:
+            self.zip_part.close()
+            self.zip_part = None
+
+    def _add_binary_part(self, data, xml_filename):
+        # Add binary data such as an image to the Zip container in
+        # 'in_memory' mode.
+        self._close_zip_part()
+        self.zip_file.writestr(_zip_info(self.zip_file, xml_filename), data)
+
     def _write_workbook_file(self):
         # Write the workbook.xml file.
         workbook = self.workbook
@@ -182,19 +213,92 @@ class Packager(object):
     def _write_worksheet_files(self):
         # Write the worksheet files.
         index = 1
+        parallel_jobs = []
         for worksheet in self.workbook.worksheets():
             if worksheet.is_chartsheet:
                 continue
 
+            xml_filename = "xl/worksheets/sheet" + str(index) + ".xml"
+            index += 1
+
+            # Worksheets that hold their data in memory can be written by
+            # worker processes. The jobs are collected and run below.
+            # The XF indices are assigned here, in sheet order, so that they
+            # match a serial write. In 'in_memory' mode the part is created
+            # when the data is written.
+            if self.worker_processes and not worksheet.constant_memory:
+                worksheet._assign_xf_indices()
+                if self.in_memory:
+                    filename = None
+                else:
+                    filename = self._filename(xml_filename)
+                parallel_jobs.append((worksheet, xml_filename, filename))
+                continue
+
+            filename = self._filename(xml_filename)
+
             if worksheet.constant_memory:
                 worksheet._opt_reopen()
                 worksheet._write_single_row()
 
-            worksheet._set_xml_writer(
-                self._filename("xl/worksheets/sheet" + str(index) + ".xml")
-            )
+            worksheet._set_xml_writer(filename)
             worksheet._assemble_xml_file()
-            index += 1
+
+        if parallel_jobs:
+            self._write_worksheet_files_parallel(parallel_jobs)
+
+    def _write_worksheet_files_parallel(self, jobs):
+        # Write worksheet XML files in a pool of worker processes. Each
+        # worksheet only needs its own data and the format and string
+        # indices that are already fixed at this point, so the sheets are
+        # independent. Sheets that can't be pickled, for example because of
+        # unpicklable user objects, are written in this process. The files
+        # are written in sheet order.
+        payloads = []
+        for worksheet, _, _ in jobs:
+            payload = None
+
+            if len(jobs) > 1:
+                try:
+                    payload = pickle.dumps(
+                        _worksheet_render_state(worksheet), pickle.HIGHEST_PROTOCOL
+                    )
+                except (pickle.PicklingError, TypeError, AttributeError):
+                    payload = None
+
+            payloads.append(payload)
+
+        pending = [payload for payload in payloads if payload is not None]
+        executor = None
+        results = iter(())
+
+        if pending:
+            workers = min(self.worker_processes, len(pending))
+            executor = ProcessPoolExecutor(max_workers=workers)
+            results = executor.map(_render_worksheet, pending)
+
+        try:
+            for (worksheet, xml_filename, filename), payload in zip(jobs, payloads):
+                if filename is None:
+                    filename = self._filename(xml_filename)
+
+                if payload is None:
+                    worksheet._set_xml_writer(filename)
+                    worksheet._assemble_xml_file()
+                    continue
+
+                # Hyperlink relationships are added while the XML is written.
+                result = next(results)
+                xml_data, worksheet.external_hyper_links, worksheet.rel_count = result
+
+                if self.in_memory:
+                    filename.write(xml_data)
+                else:
+                    with open(filename, "w", encoding="utf-8") as fh:
+                        fh.write(xml_data)
+        finally:
+            if executor is not None:
+                executor.shutdown()
 
     def _write_chartsheet_files(self):
         # Write the chartsheet files.
@@ -689,17 +793,13 @@ class Packager(object):
                     except OSError:
                         pass
             else:
-                # For in-memory mode we read the image into a stream.
+                # For in-memory mode we add the image data to the Zip file.
                 if image_data:
                     # The data is already in a byte stream.
-                    os_filename = image_data
+                    self._add_binary_part(image_data.getvalue(), xml_image_name)
                 else:
-                    image_file = open(filename, mode="rb")
-                    image_data = image_file.read()
-                    os_filename = BytesIO(image_data)
-                    image_file.close()
-
-                self.filenames.append((os_filename, xml_image_name, True))
+                    with open(filename, mode="rb") as image_file:
+                        self._add_binary_part(image_file.read(), xml_image_name)
 
             index += 1
 
@@ -726,17 +826,15 @@ class Packager(object):
                 copy(vba_project_signature, os_filename)
 
         else:
-            # For in-memory mode we read the vba into a stream.
+            # For in-memory mode we add the vba data to the Zip file.
             if vba_project_signature_is_stream:
                 # The data is already in a byte stream.
-                os_filename = vba_project_signature
+                vba_data = vba_project_signature.getvalue()
             else:
-                vba_file = open(vba_project_signature, mode="rb")
-                vba_data = vba_file.read()
-                os_filename = BytesIO(vba_data)
-                vba_file.close()
+                with open(vba_project_signature, mode="rb") as vba_file:
+                    vba_data = vba_file.read()
 
-            self.filenames.append((os_filename, xml_vba_signature_name, True))
+            self._add_binary_part(vba_data, xml_vba_signature_name)
 
     def _add_vba_project(self):
         # Copy in a vbaProject.bin file.
@@ -761,14 +859,84 @@ class Packager(object):
                 copy(vba_project, os_filename)
 
         else:
-            # For in-memory mode we read the vba into a stream.
+            # For in-memory mode we add the vba data to the Zip file.
             if vba_project_is_stream:
                 # The data is already in a byte stream.
-                os_filename = vba_project
+                vba_data = vba_project.getvalue()
             else:
-                vba_file = open(vba_project, mode="rb")
-                vba_data = vba_file.read()
-                os_filename = BytesIO(vba_data)
-                vba_file.close()
+                with open(vba_project, mode="rb") as vba_file:
+                    vba_data = vba_file.read()
+
+            self._add_binary_part(vba_data, xml_vba_name)
+
+
+class ZipPartWriter(object):
+    """
+    A class to write the XML data of an 'in_memory' part into its Zip
+    container entry. The data is encoded and compressed in chunks of
+    about buffer_size characters so that the uncompressed part is never
+    held in memory.
+
+    """
+
+    def __init__(self, zip_file, xml_filename, buffer_size=65536):
+        self.fh = zip_file.open(_zip_info(zip_file, xml_filename), mode="w")
+        self.buffer_size = buffer_size
+        self.chunks = []
+        self.size = 0
+
+    def write(self, data):
+        self.chunks.append(data)
+        self.size += len(data)
+
+        if self.size >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self.chunks:
+            self.fh.write("".join(self.chunks).encode("utf-8"))
+            self.chunks = []
+            self.size = 0
+
+    def close(self):
+        self.flush()
+        self.fh.close()
+
+
+def _zip_info(zip_file, xml_filename):
+    # Set sub-file timestamp to Excel's timestamp of 1/1/1980 and copy the
+    # compression type from the parent ZipFile.
+    zipinfo = ZipInfo(xml_filename, (1980, 1, 1, 0, 0, 0))
+    zipinfo.compress_type = zip_file.compression
+
+    return zipinfo
+
+
+def _worksheet_render_state(worksheet):
+    # Get the class and attributes needed to write a worksheet's XML in
+    # another process. Objects that are only used before packaging, such as
+    # the shared string table and the chart and image objects, are left out.
+    state = worksheet.__dict__.copy()
+    state["fh"] = None
+    state["str_table"] = None
+    state["worksheet_meta"] = None
+    state["charts"] = []
+    state["images"] = []
+    state["write_handlers"] = {}
+    state["drawing"] = 1 if worksheet.drawing else 0
+
+    return worksheet.__class__, state
+
+
+def _render_worksheet(payload):
+    # Worker process entry point: rebuild a worksheet from its pickled state
+    # and return its XML and the relationship data added while writing it.
+    worksheet_class, state = pickle.loads(payload)
+    worksheet = worksheet_class.__new__(worksheet_class)
+    worksheet.__dict__.update(state)
+
+    fh = StringIO()
+    worksheet._set_xml_writer(fh)
+    worksheet._assemble_xml_file()
 
-            self.filenames.append((os_filename, xml_vba_name, True))
+    return fh.getvalue(), worksheet.external_hyper_links, worksheet.rel_count
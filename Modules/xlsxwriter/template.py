@@ -0,0 +1,406 @@
+###############################################################################
+#
+# Template - A class for reusing the contents of a worksheet in other
+# workbooks.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright 2013-2023, John McNamara, jmcnamara@cpan.org
+#
+
+# Standard packages.
+from collections import defaultdict, namedtuple
+from warnings import warn
+
+# Package imports.
+from .utility import xl_cell_to_rowcol
+
+# A reference to one of the formats stored in a template.
+format_slot = namedtuple("FormatSlot", "index")
+format_slot.__qualname__ = "format_slot"
+
+# Worksheet attributes that belong to the workbook or to a single output
+# file and are never copied from a template.
+TEMPLATE_IGNORE = {
+    "name",
+    "index",
+    "str_table",
+    "worksheet_meta",
+    "constant_memory",
+    "tmpdir",
+    "date_1904",
+    "strings_to_numbers",
+    "strings_to_formulas",
+    "strings_to_urls",
+    "nan_inf_to_errors",
+    "default_date_format",
+    "default_url_format",
+    "excel2003_style",
+    "remove_timezone",
+    "max_url_length",
+    "use_future_functions",
+    "fh",
+    "internal_fh",
+    "row_data_filename",
+    "row_data_fh",
+    "row_data_fh_closed",
+    "fileclosed",
+    "active",
+    "selected",
+    "hidden",
+    "charts",
+    "col_pixel_offsets",
+    "row_pixel_offsets",
+}
+
+# Format attributes that are assigned by the workbook that uses the format.
+FORMAT_IGNORE = {
+    "xf_format_indices",
+    "dxf_format_indices",
+    "xf_index",
+    "dxf_index",
+    "num_format_index",
+    "font_index",
+    "has_font",
+    "has_dxf_font",
+    "fill_index",
+    "has_fill",
+    "has_dxf_fill",
+    "border_index",
+    "has_border",
+    "has_dxf_border",
+    "_format_key",
+}
+
+
+class WorksheetTemplate(object):
+    """
+    A class to hold a frozen copy of a worksheet that can be added to other
+    workbooks with Workbook.add_worksheet_from_template().
+
+    The worksheet is stored in its already parsed form, with the cell
+    formats and shared strings detached from the workbook, so that adding
+    it again doesn't repeat the write(), merge_range() and
+    conditional_format() calls that built it. Named placeholder cells can
+    be given new values for each copy.
+
+    """
+
+    ###########################################################################
+    #
+    # Public API.
+    #
+    ###########################################################################
+
+    def __init__(self, workbook, worksheet, placeholders=None):
+        """
+        Constructor. Use Workbook.capture_template() instead.
+
+        """
+        if worksheet.constant_memory:
+            raise ValueError(
+                "Worksheet templates are not supported in constant_memory mode."
+            )
+
+        self.name = worksheet.name
+        self.formats = []
+        self.attributes = {}
+        self.placeholders = {}
+        self.cells = []
+        self.rows = []
+
+        format_slots = {}
+        dxf_formats = {}
+        for xf_format in workbook.formats:
+            if xf_format.dxf_index is not None:
+                dxf_formats.setdefault(xf_format.dxf_index, xf_format)
+
+        if worksheet.charts:
+            warn(
+                "Charts in worksheet '%s' are not copied to templates."
+                % worksheet.name
+            )
+
+        # Store the attributes that differ from a new worksheet.
+        defaults = type(worksheet)().__dict__
+        for key, value in worksheet.__dict__.items():
+            if key in TEMPLATE_IGNORE:
+                continue
+            if key in defaults and defaults[key] == value:
+                continue
+
+            if key == "table":
+                self._freeze_table(value, worksheet.str_table, format_slots)
+                continue
+            elif key == "cond_formats":
+                value = _map_dxf_formats(value, dxf_formats.get)
+            elif key == "tables":
+                value = [_map_table_formats(table, dxf_formats.get) for table in value]
+
+            # Containers of immutable values can be copied without a walk.
+            if _is_flat(value):
+                self.attributes[key] = (value, False)
+            else:
+                self.attributes[key] = (
+                    _freeze(value, format_slots, self.formats),
+                    True,
+                )
+
+        # Store the placeholder cells with the format of the cell, if any.
+        for name, cell in (placeholders or {}).items():
+            if isinstance(cell, str):
+                row, col = xl_cell_to_rowcol(cell)
+            else:
+                row, col = cell
+
+            cell_format = None
+            cell_data = worksheet.table.get(row, {}).get(col)
+            if cell_data is not None:
+                cell_format = _freeze(cell_data.format, format_slots, self.formats)
+
+            self.placeholders[name] = (row, col, cell_format)
+
+    ###########################################################################
+    #
+    # Private API.
+    #
+    ###########################################################################
+
+    def _freeze_table(self, table, str_table, format_slots):
+        # Store the cell data as a list of distinct cells, with the strings
+        # instead of shared string indices, and the rows as lists of columns
+        # and cell numbers. Cells such as the formatted blanks of a merged
+        # range are then only created once when the template is added.
+        strings = {index: string for string, index in str_table.string_table.items()}
+        cell_numbers = {}
+
+        for row, cells in table.items():
+            row_cells = []
+            for col, cell in cells.items():
+                is_string = cell.__class__.__name__ in ("String", "RichString")
+                if is_string:
+                    cell = cell._replace(string=strings[cell.string])
+
+                cell = _freeze(cell, format_slots, self.formats)
+                key = (cell.__class__, tuple(cell))
+                number = cell_numbers.get(key)
+                if number is None:
+                    number = len(self.cells)
+                    cell_numbers[key] = number
+                    self.cells.append((cell, is_string))
+
+                row_cells.append((col, number))
+            self.rows.append((row, row_cells))
+
+    def _apply(self, workbook, worksheet, values):
+        # Copy the template into a new worksheet of the workbook.
+        if worksheet.constant_memory:
+            raise ValueError(
+                "Worksheet templates are not supported in constant_memory mode."
+            )
+
+        values = values or {}
+        for name in values:
+            if name not in self.placeholders:
+                warn("Unknown worksheet template placeholder '%s'." % name)
+
+        # Add a copy of each template format to the workbook.
+        formats = []
+        for properties in self.formats:
+            xf_format = workbook.add_format()
+            xf_format.__dict__.update(properties)
+            formats.append(xf_format)
+
+        placeholder_cells = {}
+        for name, (row, col, cell_format) in self.placeholders.items():
+            if name in values:
+                placeholder_cells[(row, col)] = (
+                    values[name],
+                    _thaw(cell_format, formats),
+                )
+
+        for key, (value, has_formats) in self.attributes.items():
+            if has_formats:
+                value = _thaw(value, formats)
+            else:
+                value = _copy(value)
+
+            if key == "cond_formats":
+                value = _map_dxf_formats(value, _get_dxf_index)
+            elif key == "tables":
+                value = [_map_table_formats(table, _get_dxf_index) for table in value]
+
+            setattr(worksheet, key, value)
+
+        self._apply_table(worksheet, formats, placeholder_cells)
+
+        # Placeholders outside the stored cells are written at the end.
+        for (row, col), (value, cell_format) in placeholder_cells.items():
+            worksheet.write(row, col, value, cell_format)
+
+    def _apply_table(self, worksheet, formats, placeholder_cells):
+        # Add the stored cells to the worksheet table in their original order
+        # so that the shared strings are added in the same order as before.
+        # The cell tuples are immutable so repeated cells are shared.
+        str_table = worksheet.str_table
+        worksheet_table = worksheet.table
+        cells = [None] * len(self.cells)
+
+        for row, row_cells in self.rows:
+            table_row = worksheet_table[row]
+            for col, number in row_cells:
+                if placeholder_cells and (row, col) in placeholder_cells:
+                    value, cell_format = placeholder_cells.pop((row, col))
+                    worksheet.write(row, col, value, cell_format)
+                    continue
+
+                cell = cells[number]
+                if cell is None:
+                    cell, is_string = self.cells[number]
+                    cell = _thaw(cell, formats)
+                    if is_string:
+                        cell = cell._replace(
+                            string=str_table._get_shared_string_index(cell.string)
+                        )
+                    cells[number] = cell
+                elif self.cells[number][1]:
+                    # Count each use of a shared string.
+                    str_table.count += 1
+
+                table_row[col] = cell
+
+
+def _get_dxf_index(xf_format):
+    # Get the DXF index of a format in the workbook that it belongs to.
+    return xf_format._get_dxf_index()
+
+
+def _map_dxf_formats(cond_formats, map_format):
+    # Map the "format" of each conditional format rule, a DXF index in a
+    # worksheet and a Format object in a template.
+    mapped = {}
+    for cell_range, rules in cond_formats.items():
+        mapped_rules = []
+        for rule in rules:
+            if rule.get("format") is not None:
+                rule = dict(rule)
+                rule["format"] = map_format(rule["format"])
+            mapped_rules.append(rule)
+        mapped[cell_range] = mapped_rules
+
+    return mapped
+
+
+def _map_table_formats(table, map_format):
+    # Map the DXF formats of the columns of a worksheet table.
+    table = dict(table)
+    columns = []
+    for column in table.get("columns", []):
+        if column.get("format") is not None:
+            column = dict(column)
+            column["format"] = map_format(column["format"])
+        columns.append(column)
+
+    if "columns" in table:
+        table["columns"] = columns
+
+    return table
+
+
+def _is_flat(obj):
+    # Check if an object is a container of strings, numbers and tuples of
+    # them, which can be copied with a shallow copy.
+    if isinstance(obj, dict):
+        items = obj.values()
+    elif isinstance(obj, (list, set)):
+        items = obj
+    else:
+        return False
+
+    for item in items:
+        if isinstance(item, tuple):
+            if not all(isinstance(x, (str, int, float)) for x in item):
+                return False
+        elif item is not None and not isinstance(item, (str, int, float)):
+            return False
+
+    return True
+
+
+def _copy(obj):
+    # Shallow copy of a flat container, keeping the type of a defaultdict.
+    if isinstance(obj, defaultdict):
+        return defaultdict(obj.default_factory, obj)
+    return obj.copy()
+
+
+def _freeze(obj, format_slots, formats):
+    # Copy a worksheet data structure with its Format objects replaced by
+    # references to format properties stored in the template.
+    if obj is None or isinstance(obj, (str, int, float, bool)):
+        return obj
+
+    if obj.__class__.__name__ == "Format":
+        slot = format_slots.get(id(obj))
+        if slot is None:
+            properties = {
+                key: value
+                for key, value in obj.__dict__.items()
+                if key not in FORMAT_IGNORE
+            }
+            slot = format_slot(len(formats))
+            format_slots[id(obj)] = slot
+            formats.append(properties)
+        return slot
+
+    if isinstance(obj, tuple):
+        values = [_freeze(item, format_slots, formats) for item in obj]
+        if hasattr(obj, "_fields"):
+            return obj.__class__(*values)
+        return tuple(values)
+
+    if isinstance(obj, list):
+        return [_freeze(item, format_slots, formats) for item in obj]
+
+    if isinstance(obj, dict):
+        copy = {
+            key: _freeze(value, format_slots, formats) for key, value in obj.items()
+        }
+        if isinstance(obj, defaultdict):
+            copy = defaultdict(obj.default_factory, copy)
+        return copy
+
+    if isinstance(obj, set):
+        return set(obj)
+
+    # Other objects, such as image data, are shared.
+    return obj
+
+
+def _thaw(obj, formats):
+    # Copy a frozen data structure with the format references replaced by
+    # the formats of a workbook.
+    if obj is None or isinstance(obj, (str, int, float, bool)):
+        return obj
+
+    if isinstance(obj, format_slot):
+        return formats[obj.index]
+
+    if isinstance(obj, tuple):
+        values = [_thaw(item, formats) for item in obj]
+        if hasattr(obj, "_fields"):
+            return obj.__class__(*values)
+        return tuple(values)
+
+    if isinstance(obj, list):
+        return [_thaw(item, formats) for item in obj]
+
+    if isinstance(obj, dict):
+        copy = {key: _thaw(value, formats) for key, value in obj.items()}
+        if isinstance(obj, defaultdict):
+            copy = defaultdict(obj.default_factory, copy)
+        return copy
+
+    if isinstance(obj, set):
+        return set(obj)
+
+    return obj
@@ -6,8 +6,6 @@
 # Copyright 2013-2023, John McNamara, jmcnamara@cpan.org
 #
 
-from io import StringIO
-
 
 class Theme(object):
     """
@@ -45,12 +43,12 @@ class Theme(object):
 
     def _set_xml_writer(self, filename):
         # Set the XML writer filehandle for the object.
-        if isinstance(filename, StringIO):
-            self.internal_fh = False
-            self.fh = filename
-        else:
+        if isinstance(filename, str):
             self.internal_fh = True
             self.fh = open(filename, mode="w", encoding="utf-8")
+        else:
+            self.internal_fh = False
+            self.fh = filename
 
     ###########################################################################
     #
@@ -7,6 +7,7 @@
 #
 import re
 import datetime
+from functools import lru_cache
 from warnings import warn
 
 COL_NAMES = {}
@@ -114,6 +115,9 @@ re_leading = re.compile(r"^\s")
 re_trailing = re.compile(r"\s$")
 re_range_parts = re.compile(r"(\$?)([A-Z]{1,3})(\$?)(\d+)")
 
+# Maximum number of distinct A1 references memoized by the *_fast parsers.
+A1_CACHE_SIZE = 8192
+
 
 def xl_rowcol_to_cell(row, col, row_abs=False, col_abs=False):
     """
@@ -238,6 +242,59 @@ def xl_cell_to_rowcol(cell_str):
     return row, col
 
 
+@lru_cache(maxsize=A1_CACHE_SIZE)
+def xl_cell_to_rowcol_fast(cell_str):
+    """
+    Memoized version of the xl_cell_to_rowcol function. Only used internally.
+
+    Args:
+       cell_str:  A1 style string.
+
+    Returns:
+        (row, col): Zero indexed cell row and column indices.
+
+    """
+    return xl_cell_to_rowcol(cell_str)
+
+
+@lru_cache(maxsize=A1_CACHE_SIZE)
+def xl_range_to_rowcol_fast(range_str):
+    """
+    Convert a cell or range reference in A1 notation to zero indexed
+    first/last row and column indices. Memoized. Only used internally.
+
+    Args:
+       range_str:  A1 style cell ("C3") or range ("C3:D3") string.
+
+    Returns:
+        (first_row, first_col, last_row, last_col): Zero indexed indices.
+
+    """
+    if ":" in range_str:
+        cell_1, cell_2 = range_str.split(":")
+        return xl_cell_to_rowcol(cell_1) + xl_cell_to_rowcol(cell_2)
+
+    row, col = xl_cell_to_rowcol(range_str)
+    return row, col, row, col
+
+
+@lru_cache(maxsize=A1_CACHE_SIZE)
+def xl_col_range_to_cols_fast(range_str):
+    """
+    Convert a column range such as "B:D" to zero indexed first and last
+    column indices. Memoized. Only used internally.
+
+    Args:
+       range_str:  Column range string.
+
+    Returns:
+        (first_col, last_col): Zero indexed column indices.
+
+    """
+    cell_1, cell_2 = [col + "1" for col in range_str.split(":")]
+    return xl_cell_to_rowcol(cell_1)[1], xl_cell_to_rowcol(cell_2)[1]
+
+
 def xl_cell_to_rowcol_abs(cell_str):
     """
     Convert an absolute cell reference in A1 notation to a zero indexed
@@ -866,6 +923,215 @@ def datetime_to_excel_datetime(dt_obj, date_1904, remove_timezone):
     return excel_time
 
 
+# Ordinals of the Excel epochs, precomputed for the bulk conversions below.
+EPOCH_1900_ORDINAL = datetime.date(1899, 12, 31).toordinal()
+EPOCH_1904_ORDINAL = datetime.date(1904, 1, 1).toordinal()
+EXCEL_1900_ORDINAL = datetime.date(1900, 1, 1).toordinal()
+
+
+def datetimes_to_excel_datetimes(dt_objs, date_1904, remove_timezone):
+    # Convert a sequence of datetime objects to Excel serial dates in one
+    # pass. Gives the same results as datetime_to_excel_datetime() but
+    # works on integer day ordinals against a precomputed epoch instead of
+    # building a timedelta per value. None (or NaT in a NumPy array) is
+    # returned as None. NumPy datetime64/timedelta64 arrays are converted
+    # with array arithmetic.
+    if type(dt_objs).__module__ == "numpy" and dt_objs.dtype.kind in "Mm":
+        return _numpy_to_excel_datetimes(dt_objs, date_1904)
+
+    epoch_ordinal = EPOCH_1904_ORDINAL if date_1904 else EPOCH_1900_ORDINAL
+    leap_fix = not date_1904
+    datetime_type = datetime.datetime
+    date_type = datetime.date
+    time_type = datetime.time
+    timedelta_type = datetime.timedelta
+    numbers = []
+    append = numbers.append
+
+    for dt_obj in dt_objs:
+        dt_type = type(dt_obj)
+
+        if dt_type is datetime_type:
+            if dt_obj.tzinfo is not None:
+                dt_obj = remove_datetime_timezone(dt_obj, remove_timezone)
+            ordinal = dt_obj.toordinal()
+            excel_time = ordinal - epoch_ordinal + (
+                float(dt_obj.hour * 3600 + dt_obj.minute * 60 + dt_obj.second)
+                + float(dt_obj.microsecond) / 1e6
+            ) / (60 * 60 * 24)
+            # See datetime_to_excel_datetime() for the 1900-01-01 offset.
+            if ordinal == EXCEL_1900_ORDINAL:
+                excel_time -= 1
+        elif dt_type is date_type:
+            excel_time = dt_obj.toordinal() - epoch_ordinal + 0.0
+        elif dt_type is time_type:
+            if dt_obj.tzinfo is not None:
+                dt_obj = remove_datetime_timezone(dt_obj, remove_timezone)
+            excel_time = 0 + (
+                float(dt_obj.hour * 3600 + dt_obj.minute * 60 + dt_obj.second)
+                + float(dt_obj.microsecond) / 1e6
+            ) / (60 * 60 * 24)
+        elif dt_type is timedelta_type:
+            append(
+                dt_obj.days
+                + (float(dt_obj.seconds) + float(dt_obj.microseconds) / 1e6)
+                / (60 * 60 * 24)
+            )
+            continue
+        elif dt_obj is None:
+            append(None)
+            continue
+        else:
+            # Subclasses such as pandas.Timestamp take the general path.
+            append(datetime_to_excel_datetime(dt_obj, date_1904, remove_timezone))
+            continue
+
+        # Account for Excel erroneously treating 1900 as a leap year.
+        if leap_fix and excel_time > 59:
+            excel_time += 1
+
+        append(excel_time)
+
+    return numbers
+
+
+def _numpy_to_excel_datetimes(dt_array, date_1904):
+    # Vectorized version of datetimes_to_excel_datetimes() for NumPy
+    # datetime64 and timedelta64 arrays. NumPy values carry no timezone.
+    import numpy
+
+    is_timedelta = dt_array.dtype.kind == "m"
+    unit = "timedelta64[us]" if is_timedelta else "datetime64[us]"
+    microseconds = dt_array.astype(unit).astype(numpy.int64)
+    missing = numpy.isnat(dt_array)
+
+    usecs_per_day = 86400 * 1000000
+    days = microseconds // usecs_per_day
+    remainder = microseconds % usecs_per_day
+    excel_times = days + (
+        (remainder // 1000000).astype(numpy.float64)
+        + (remainder % 1000000).astype(numpy.float64) / 1e6
+    ) / (60 * 60 * 24)
+
+    if not is_timedelta:
+        # Shift from the Unix epoch to the Excel epoch.
+        epoch_ordinal = EPOCH_1904_ORDINAL if date_1904 else EPOCH_1900_ORDINAL
+        excel_times += datetime.date(1970, 1, 1).toordinal() - epoch_ordinal
+        excel_times[days == EXCEL_1900_ORDINAL - datetime.date(1970, 1, 1).toordinal()] -= 1
+        if not date_1904:
+            excel_times[excel_times > 59] += 1
+
+    numbers = excel_times.tolist()
+    if missing.any():
+        for index in numpy.flatnonzero(missing).tolist():
+            numbers[index] = None
+
+    return numbers
+
+
+def downsample_lttb(x_values, y_values, points):
+    # Select the indices of up to `points` values that best preserve the
+    # visual shape of a series using the Largest-Triangle-Three-Buckets
+    # algorithm. The first and last points are always kept. The bucket
+    # areas are computed with NumPy when it is installed.
+    count = len(y_values)
+
+    if points >= count or points < 3:
+        return list(range(count))
+
+    numpy = _import_numpy()
+    if numpy is not None:
+        x_values = numpy.asarray(x_values, dtype=numpy.float64)
+        y_values = numpy.asarray(y_values, dtype=numpy.float64)
+
+    bucket_size = (count - 2) / (points - 2)
+    indices = [0]
+    selected = 0
+
+    for i in range(points - 2):
+        # The average of the next bucket is the third point of the triangle.
+        next_start = int((i + 1) * bucket_size) + 1
+        next_end = min(int((i + 2) * bucket_size) + 1, count)
+        start = int(i * bucket_size) + 1
+        end = next_start
+        selected_x = x_values[selected]
+        selected_y = y_values[selected]
+
+        if numpy is not None:
+            avg_x = x_values[next_start:next_end].mean()
+            avg_y = y_values[next_start:next_end].mean()
+            areas = numpy.abs(
+                (selected_x - avg_x) * (y_values[start:end] - selected_y)
+                - (selected_x - x_values[start:end]) * (avg_y - selected_y)
+            )
+            selected = start + int(areas.argmax())
+        else:
+            span = next_end - next_start
+            avg_x = sum(x_values[next_start:next_end]) / span
+            avg_y = sum(y_values[next_start:next_end]) / span
+            max_area = -1.0
+            for j in range(start, end):
+                area = abs(
+                    (selected_x - avg_x) * (y_values[j] - selected_y)
+                    - (selected_x - x_values[j]) * (avg_y - selected_y)
+                )
+                if area > max_area:
+                    max_area = area
+                    selected = j
+
+        indices.append(selected)
+
+    indices.append(count - 1)
+
+    return indices
+
+
+def downsample_min_max(y_values, points):
+    # Select the indices of up to `points` values by keeping the minimum
+    # and maximum of each of points / 2 equal buckets, in index order.
+    count = len(y_values)
+
+    if points >= count or points < 2:
+        return list(range(count))
+
+    numpy = _import_numpy()
+    if numpy is not None:
+        y_values = numpy.asarray(y_values, dtype=numpy.float64)
+
+    buckets = points // 2
+    bucket_size = count / buckets
+    indices = []
+
+    for i in range(buckets):
+        start = int(i * bucket_size)
+        end = int((i + 1) * bucket_size) if i < buckets - 1 else count
+
+        if numpy is not None:
+            bucket = y_values[start:end]
+            low = start + int(bucket.argmin())
+            high = start + int(bucket.argmax())
+        else:
+            low = min(range(start, end), key=y_values.__getitem__)
+            high = max(range(start, end), key=y_values.__getitem__)
+
+        if low == high:
+            indices.append(low)
+        else:
+            indices.extend(sorted((low, high)))
+
+    return indices
+
+
+def _import_numpy():
+    # NumPy is optional and only used to speed up bulk operations.
+    try:
+        import numpy
+    except ImportError:
+        numpy = None
+
+    return numpy
+
+
 def preserve_whitespace(string):
     # Check if a string has leading or trailing whitespace that requires a
     # "preserve" attribute.
@@ -12,21 +12,24 @@ import operator
 import os
 import re
 import time
-from datetime import datetime, timezone
+from datetime import date, datetime, time as dt_time, timedelta, timezone
 from decimal import Decimal
 from fractions import Fraction
+from io import BytesIO
 from struct import unpack
 from warnings import warn
-from zipfile import ZipFile, ZipInfo, ZIP_DEFLATED, LargeZipFile
+from zipfile import ZipFile, ZIP_DEFLATED, LargeZipFile, BadZipFile
 
 
 # Package imports.
+from . import __version__
 from . import xmlwriter
 from .worksheet import Worksheet
 from .chartsheet import Chartsheet
 from .sharedstrings import SharedStringTable
 from .format import Format
 from .packager import Packager
+from .template import WorksheetTemplate
 from .utility import xl_cell_to_rowcol
 from .chart_area import ChartArea
 from .chart_bar import ChartBar
@@ -81,11 +84,27 @@ class Workbook(xmlwriter.XMLwriter):
         self.default_date_format = options.get("default_date_format", None)
         self.constant_memory = options.get("constant_memory", False)
         self.in_memory = options.get("in_memory", False)
+        self.stream_chunk_size = options.get("stream_chunk_size", 65536)
         self.excel2003_style = options.get("excel2003_style", False)
         self.remove_timezone = options.get("remove_timezone", False)
         self.use_future_functions = options.get("use_future_functions", False)
         self.default_format_properties = options.get("default_format_properties", {})
 
+        # Optionally merge identical conditional formats and data validations
+        # on different ranges into single rules with multi-area ranges.
+        self.coalesce_rules = options.get("coalesce_rules", False)
+
+        # Deterministic builds have a fixed creation date and carry a
+        # fingerprint of their contents so that unchanged files aren't
+        # rewritten.
+        self.deterministic = options.get("deterministic", False)
+
+        # Optional number of processes used to write the worksheet XML files
+        # in parallel during close(). True uses one process per CPU.
+        self.worker_processes = options.get("worker_processes", 0)
+        if self.worker_processes is True:
+            self.worker_processes = os.cpu_count() or 1
+
         self.max_url_length = options.get("max_url_length", 2079)
         if self.max_url_length < 255:
             self.max_url_length = 2079
@@ -190,6 +209,44 @@ class Workbook(xmlwriter.XMLwriter):
 
         return self._add_sheet(name, worksheet_class=worksheet_class)
 
+    def capture_template(self, worksheet, placeholders=None):
+        """
+        Capture a worksheet of the workbook as a template that can be added
+        to other workbooks with add_worksheet_from_template().
+
+        Args:
+            worksheet:    The worksheet to capture, after it has been written.
+            placeholders: Optional dict of placeholder names and the cells,
+                          in A1 or (row, col) notation, whose values can be
+                          replaced when the template is added.
+
+        Returns:
+            Reference to a WorksheetTemplate object.
+
+        """
+        return WorksheetTemplate(self, worksheet, placeholders)
+
+    def add_worksheet_from_template(self, template, name=None, values=None):
+        """
+        Add a new worksheet with the contents of a worksheet template.
+
+        Args:
+            template: A template from capture_template().
+            name:     The worksheet name. Defaults to the template sheet name.
+            values:   Optional dict of new values for the template placeholders.
+
+        Returns:
+            Reference to a worksheet object.
+
+        """
+        if name is None:
+            name = template.name
+
+        worksheet = self.add_worksheet(name)
+        template._apply(self, worksheet, values)
+
+        return worksheet
+
     def add_chartsheet(self, name=None, chartsheet_class=None):
         """
         Add a new chartsheet to the Excel workbook.
@@ -347,6 +404,14 @@ class Workbook(xmlwriter.XMLwriter):
 
         """
         if not self.fileclosed:
+            if self.deterministic and self._prepare_deterministic():
+                # The existing file already has the same contents.
+                self.fileclosed = True
+                if self.constant_memory:
+                    for worksheet in self.worksheets():
+                        worksheet._opt_close()
+                return
+
             try:
                 self._store_workbook()
             except IOError as e:
@@ -684,10 +749,17 @@ class Workbook(xmlwriter.XMLwriter):
         self._xml_close()
 
     def _store_workbook(self):
-        # Create the xlsx/zip file.
+        # Create the xlsx/zip file. The output can be a filename, a file-like
+        # object or a callable that is passed the file data in chunks. Output
+        # that isn't seekable, such as a pipe, a socket or a callable, is
+        # written sequentially using ZIP data descriptors.
+        output = self.filename
+        if callable(output) and not hasattr(output, "write"):
+            output = ChunkWriter(output, self.stream_chunk_size)
+
         try:
             xlsx_file = ZipFile(
-                self.filename,
+                output,
                 "w",
                 compression=ZIP_DEFLATED,
                 allowZip64=self.allow_zip64,
@@ -743,45 +815,82 @@ class Workbook(xmlwriter.XMLwriter):
         packager._add_workbook(self)
         packager._set_tmpdir(self.tmpdir)
         packager._set_in_memory(self.in_memory)
+        packager._set_zip_file(xlsx_file)
+        packager._set_worker_processes(self.worker_processes)
         xml_files = packager._create_package()
 
         # Free up the Packager object.
         packager = None
 
-        # Add XML sub-files to the Zip file with their Excel filename.
+        # Add XML sub-files to the Zip file with their Excel filename. The
+        # sub-files are tempfiles on disk. In 'in_memory' mode the packager
+        # has already written the data into the Zip file.
         for file_id, file_data in enumerate(xml_files):
             os_filename, xml_filename, is_binary = file_data
 
-            if self.in_memory:
-                # Set sub-file timestamp to Excel's timestamp of 1/1/1980.
-                zipinfo = ZipInfo(xml_filename, (1980, 1, 1, 0, 0, 0))
+            # Set sub-file timestamp to 31/1/1980 due to portability
+            # issues setting it to Excel's timestamp of 1/1/1980.
+            timestamp = time.mktime((1980, 1, 31, 0, 0, 0, 0, 0, -1))
+            os.utime(os_filename, (timestamp, timestamp))
 
-                # Copy compression type from parent ZipFile.
-                zipinfo.compress_type = xlsx_file.compression
-
-                if is_binary:
-                    xlsx_file.writestr(zipinfo, os_filename.getvalue())
-                else:
-                    xlsx_file.writestr(zipinfo, os_filename.getvalue().encode("utf-8"))
-            else:
-                # The sub-files are tempfiles on disk, i.e, not in memory.
-
-                # Set sub-file timestamp to 31/1/1980 due to portability
-                # issues setting it to Excel's timestamp of 1/1/1980.
-                timestamp = time.mktime((1980, 1, 31, 0, 0, 0, 0, 0, -1))
-                os.utime(os_filename, (timestamp, timestamp))
-
-                try:
-                    xlsx_file.write(os_filename, xml_filename)
-                    os.remove(os_filename)
-                except LargeZipFile as e:
-                    # Close open temp files on zipfile.LargeZipFile exception.
-                    for i in range(file_id, len(xml_files) - 1):
-                        os.remove(xml_files[i][0])
-                    raise e
+            try:
+                xlsx_file.write(os_filename, xml_filename)
+                os.remove(os_filename)
+            except LargeZipFile as e:
+                # Close open temp files on zipfile.LargeZipFile exception.
+                for i in range(file_id, len(xml_files) - 1):
+                    os.remove(xml_files[i][0])
+                raise e
 
         xlsx_file.close()
 
+    def _prepare_deterministic(self):
+        # Fix the creation date, add the content fingerprint as a custom
+        # property and check if the existing output file has the same
+        # fingerprint, in which case it doesn't need to be written.
+        if "created" not in self.doc_properties:
+            self.doc_properties = dict(self.doc_properties)
+            self.doc_properties["created"] = datetime(1980, 1, 1, tzinfo=timezone.utc)
+
+        fingerprint = self._get_fingerprint()
+
+        if _read_fingerprint(self.filename) == fingerprint:
+            return True
+
+        self.set_custom_property(FINGERPRINT_PROPERTY, fingerprint)
+        return False
+
+    def _get_fingerprint(self):
+        # Get a digest of everything that goes into the file: the workbook
+        # and worksheet settings, cells, formats, charts and the contents of
+        # images and other files that are read during packaging.
+        hasher = hashlib.sha256()
+        hasher.update(("XlsxWriter " + __version__ + "\x00").encode("utf-8"))
+
+        _fingerprint_update(hasher, self, {})
+
+        filenames = []
+        for sheet in self.worksheets():
+            filenames.extend(sheet._get_image_filenames())
+
+            # In constant_memory mode most of the cell data is in the
+            # worksheet's temp file.
+            if self.constant_memory and sheet.row_data_fh is not None:
+                sheet.row_data_fh.flush()
+                filenames.append(sheet.row_data_filename)
+
+        if self.vba_project and not self.vba_project_is_stream:
+            filenames.append(self.vba_project)
+
+        if self.vba_project_signature and not self.vba_project_signature_is_stream:
+            filenames.append(self.vba_project_signature)
+
+        for filename in filenames:
+            with open(filename, "rb") as fh:
+                hasher.update(hashlib.sha256(fh.read()).digest())
+
+        return hasher.hexdigest()
+
     def _add_sheet(self, name, worksheet_class=None):
         # Utility for shared code in add_worksheet() and add_chartsheet().
 
@@ -812,6 +921,7 @@ class Workbook(xmlwriter.XMLwriter):
             "remove_timezone": self.remove_timezone,
             "max_url_length": self.max_url_length,
             "use_future_functions": self.use_future_functions,
+            "coalesce_rules": self.coalesce_rules,
         }
 
         worksheet._initialize(init_data)
@@ -1237,6 +1347,10 @@ class Workbook(xmlwriter.XMLwriter):
 
                 sheet._prepare_background(ref_id, image_type)
 
+            # Precompute the row and column offsets used to position the
+            # images, charts and shapes.
+            sheet._set_pixel_offsets()
+
             # Prepare the worksheet images.
             for index in range(image_count):
                 filename = sheet.images[index][2]
@@ -1281,6 +1395,8 @@ class Workbook(xmlwriter.XMLwriter):
             for index in range(shape_count):
                 sheet._prepare_shape(index, drawing_id)
 
+            sheet._clear_pixel_offsets()
+
             # Prepare the header images.
             for index in range(header_image_count):
                 filename = sheet.header_images[index][0]
@@ -1986,6 +2102,151 @@ class Workbook(xmlwriter.XMLwriter):
         self._xml_data_element("definedName", sheet_range, attributes)
 
 
+# Name of the custom property that holds the fingerprint of a deterministic
+# build.
+FINGERPRINT_PROPERTY = "XlsxWriterFingerprint"
+
+# Attributes that don't change the file contents, or that change from one
+# run to the next, and are left out of the fingerprint.
+FINGERPRINT_IGNORE = {
+    "filename",
+    "fileclosed",
+    "filehandle",
+    "createtime",
+    "tmpdir",
+    "fh",
+    "internal_fh",
+    "row_data_fh",
+    "row_data_filename",
+    "row_data_fh_closed",
+    "in_memory",
+    "stream_chunk_size",
+    "worker_processes",
+    "_format_key",
+}
+
+FINGERPRINT_ATOMS = (
+    type(None),
+    bool,
+    int,
+    float,
+    str,
+    bytes,
+    Decimal,
+    Fraction,
+    date,
+    datetime,
+    dt_time,
+    timedelta,
+)
+
+
+def _fingerprint_update(hasher, obj, seen):
+    # Add a canonical form of an object graph to the fingerprint hash.
+    # Objects that were already seen, such as shared formats, are added by
+    # reference.
+    if isinstance(obj, FINGERPRINT_ATOMS):
+        hasher.update(repr(obj).encode("utf-8", "surrogatepass") + b"\x00")
+        return
+
+    if isinstance(obj, (list, tuple)):
+        hasher.update(type(obj).__name__.encode("utf-8") + b"[")
+        for item in obj:
+            _fingerprint_update(hasher, item, seen)
+        hasher.update(b"]")
+        return
+
+    if isinstance(obj, dict):
+        try:
+            keys = sorted(obj.keys())
+        except TypeError:
+            keys = sorted(obj.keys(), key=repr)
+
+        hasher.update(b"{")
+        for key in keys:
+            if key in FINGERPRINT_IGNORE:
+                continue
+            _fingerprint_update(hasher, key, seen)
+            _fingerprint_update(hasher, obj[key], seen)
+        hasher.update(b"}")
+        return
+
+    if isinstance(obj, (set, frozenset)):
+        _fingerprint_update(hasher, sorted(obj, key=repr), seen)
+        return
+
+    if isinstance(obj, BytesIO):
+        hasher.update(hashlib.sha256(obj.getvalue()).digest())
+        return
+
+    if id(obj) in seen:
+        hasher.update(("@%d\x00" % seen[id(obj)]).encode("utf-8"))
+        return
+
+    if hasattr(obj, "__dict__"):
+        seen[id(obj)] = len(seen)
+        hasher.update(("<" + type(obj).__name__).encode("utf-8"))
+        _fingerprint_update(hasher, obj.__dict__, seen)
+        hasher.update(b">")
+        return
+
+    # Functions, classes and other objects without state.
+    name = getattr(obj, "__qualname__", type(obj).__name__)
+    hasher.update(("?" + name + "\x00").encode("utf-8"))
+
+
+def _read_fingerprint(filename):
+    # Get the fingerprint stored in an existing xlsx file, if any.
+    if not isinstance(filename, str) or not os.path.exists(filename):
+        return None
+
+    try:
+        with ZipFile(filename) as xlsx_file:
+            custom = xlsx_file.read("docProps/custom.xml").decode("utf-8")
+    except (IOError, KeyError, BadZipFile):
+        return None
+
+    match = re.search(
+        r'name="%s"><vt:lpwstr>([0-9a-f]+)</vt:lpwstr>' % FINGERPRINT_PROPERTY,
+        custom,
+    )
+
+    if match:
+        return match.group(1)
+
+    return None
+
+
+# A write-only file object that passes the data on to a callable.
+class ChunkWriter(object):
+    """
+    A class to buffer the zip file data and pass it on in chunks of at
+    least chunk_size bytes to a callable, such as an upload function.
+
+    """
+
+    def __init__(self, callback, chunk_size=65536):
+        self.callback = callback
+        self.chunk_size = chunk_size
+        self.chunks = []
+        self.size = 0
+
+    def write(self, data):
+        self.chunks.append(data)
+        self.size += len(data)
+
+        if self.size >= self.chunk_size:
+            self.flush()
+
+        return len(data)
+
+    def flush(self):
+        if self.size:
+            self.callback(b"".join(self.chunks))
+            self.chunks = []
+            self.size = 0
+
+
 # A metadata class to share data between worksheets.
 class WorksheetMeta(object):
     """
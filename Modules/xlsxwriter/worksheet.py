@@ -13,6 +13,7 @@ import os
 import re
 import tempfile
 
+from bisect import bisect_left
 from collections import defaultdict
 from collections import namedtuple
 from decimal import Decimal
@@ -32,6 +33,9 @@ from .xmlwriter import XMLwriter
 from .utility import xl_rowcol_to_cell
 from .utility import xl_rowcol_to_cell_fast
 from .utility import xl_cell_to_rowcol
+from .utility import xl_cell_to_rowcol_fast
+from .utility import xl_range_to_rowcol_fast
+from .utility import xl_col_range_to_cols_fast
 from .utility import xl_col_to_name
 from .utility import xl_range
 from .utility import xl_color
@@ -39,6 +43,7 @@ from .utility import xl_pixel_width
 from .utility import get_sparkline_style
 from .utility import supported_datetime
 from .utility import datetime_to_excel_datetime
+from .utility import datetimes_to_excel_datetimes
 from .utility import preserve_whitespace
 from .utility import quote_sheetname
 from .exceptions import DuplicateTableName
@@ -82,12 +87,50 @@ re_dynamic_function = re.compile(
     re.VERBOSE,
 )
 
+# Cell, column and row references in formulas. Used to check that a rule
+# doesn't depend on the position of its range.
+re_string_literal = re.compile(r'"(?:[^"]|"")*"')
+re_relative_ref = re.compile(
+    r"""
+    (?<![\w.$])
+    (?:
+        [A-Za-z]{1,3}\$?\d+ | \$[A-Za-z]{1,3}\d+ |
+        (?:[A-Za-z]{1,3}|\d+):\$?(?:[A-Za-z]{1,3}|\d+) |
+        \$(?:[A-Za-z]{1,3}|\d+):(?:[A-Za-z]{1,3}|\d+)
+    )
+    (?![\w(])""",
+    re.VERBOSE,
+)
+
+# Conditional format rule types that can share a range. The other types,
+# such as top/bottom, duplicate values or color scales, depend on the
+# values in the whole range.
+COALESCE_CF_TYPES = {"cellIs", "expression"}
+
 
 ###############################################################################
 #
 # Decorator functions.
 #
 ###############################################################################
+def _is_a1_arg(first_arg):
+    # Check if the first arg of a cell, range or column method, other than
+    # an int, is in A1 notation. Strings that don't start with a digit are
+    # A1 references. Anything else, such as the int-like string "5" or a
+    # float, is row/col if int() accepts it. The decorators pass ints
+    # straight through without calling this.
+    if isinstance(first_arg, str):
+        if not first_arg.strip().lstrip("+-")[:1].isdecimal():
+            return True
+
+    try:
+        int(first_arg)
+    except ValueError:
+        return True
+
+    return False
+
+
 def convert_cell_args(method):
     """
     Decorator function to convert A1 notation in cell method calls
@@ -97,15 +140,10 @@ def convert_cell_args(method):
 
     @wraps(method)
     def cell_wrapper(self, *args, **kwargs):
-        try:
-            # First arg is an int, default to row/col notation.
-            if args:
-                first_arg = args[0]
-                int(first_arg)
-        except ValueError:
-            # First arg isn't an int, convert to A1 notation.
-            new_args = xl_cell_to_rowcol(first_arg)
-            args = new_args + args[1:]
+        # Convert A1 notation, otherwise default to row/col notation. The
+        # parse is memoized since the same references recur across calls.
+        if args and not isinstance(args[0], int) and _is_a1_arg(args[0]):
+            args = xl_cell_to_rowcol_fast(args[0]) + args[1:]
 
         return method(self, *args, **kwargs)
 
@@ -121,23 +159,9 @@ def convert_range_args(method):
 
     @wraps(method)
     def cell_wrapper(self, *args, **kwargs):
-        try:
-            # First arg is an int, default to row/col notation.
-            if args:
-                int(args[0])
-        except ValueError:
-            # First arg isn't an int, convert to A1 notation.
-            if ":" in args[0]:
-                cell_1, cell_2 = args[0].split(":")
-                row_1, col_1 = xl_cell_to_rowcol(cell_1)
-                row_2, col_2 = xl_cell_to_rowcol(cell_2)
-            else:
-                row_1, col_1 = xl_cell_to_rowcol(args[0])
-                row_2, col_2 = row_1, col_1
-
-            new_args = [row_1, col_1, row_2, col_2]
-            new_args.extend(args[1:])
-            args = new_args
+        # Convert an A1 cell or range, otherwise default to row/col notation.
+        if args and not isinstance(args[0], int) and _is_a1_arg(args[0]):
+            args = xl_range_to_rowcol_fast(args[0]) + args[1:]
 
         return method(self, *args, **kwargs)
 
@@ -153,18 +177,10 @@ def convert_column_args(method):
 
     @wraps(method)
     def column_wrapper(self, *args, **kwargs):
-        try:
-            # First arg is an int, default to row/col notation.
-            if args:
-                int(args[0])
-        except ValueError:
-            # First arg isn't an int, convert to A1 notation.
-            cell_1, cell_2 = [col + "1" for col in args[0].split(":")]
-            _, col_1 = xl_cell_to_rowcol(cell_1)
-            _, col_2 = xl_cell_to_rowcol(cell_2)
-            new_args = [col_1, col_2]
-            new_args.extend(args[1:])
-            args = new_args
+        # Convert a column range such as "B:D", otherwise default to row/col
+        # notation.
+        if args and not isinstance(args[0], int) and _is_a1_arg(args[0]):
+            args = xl_col_range_to_cols_fast(args[0]) + args[1:]
 
         return method(self, *args, **kwargs)
 
@@ -187,12 +203,217 @@ cell_arformula_tuple = namedtuple(
 )
 cell_rich_string_tuple = namedtuple("RichString", "string, format, raw_string")
 
+# The type names above are used to identify cells. Point the qualified names
+# at the module attributes so that cells can be pickled by reference.
+cell_string_tuple.__qualname__ = "cell_string_tuple"
+cell_number_tuple.__qualname__ = "cell_number_tuple"
+cell_blank_tuple.__qualname__ = "cell_blank_tuple"
+cell_boolean_tuple.__qualname__ = "cell_boolean_tuple"
+cell_formula_tuple.__qualname__ = "cell_formula_tuple"
+cell_datetime_tuple.__qualname__ = "cell_datetime_tuple"
+cell_arformula_tuple.__qualname__ = "cell_arformula_tuple"
+cell_rich_string_tuple.__qualname__ = "cell_rich_string_tuple"
+
+
+###############################################################################
+#
+# Lazy range data for chart caches.
+#
+###############################################################################
+class RangeData(object):
+    """
+    A read-only sequence view of a worksheet range used for chart cached
+    data. Strings are returned from the shared string table, numbers with
+    Excel's precision and formulas as their value. None is returned for
+    data that doesn't exist since Excel can chart series with data missing.
+
+    """
+
+    def __init__(self, worksheet, row_start, col_start, row_end, col_end):
+        self.table = worksheet.table
+        self.str_table = worksheet.str_table
+        self.row_start = row_start
+        self.col_start = col_start
+        self.row_end = row_end
+        self.col_end = col_end
+        self.count = None
+
+    def __iter__(self):
+        table = self.table
+        get_shared_string = self.str_table._get_shared_string
+        col_range = range(self.col_start, self.col_end + 1)
+
+        for row_num in range(self.row_start, self.row_end + 1):
+            # Return None if the row doesn't exist. Rows without data may
+            # exist as empty dicts once the worksheet has been written.
+            row = table.get(row_num)
+            if not row:
+                yield None
+                continue
+
+            for col_num in col_range:
+                cell = row.get(col_num)
+
+                if cell is None:
+                    # Return None if column doesn't exist.
+                    yield None
+                    continue
+
+                cell_type = cell.__class__.__name__
+
+                if cell_type in ("Number", "Datetime"):
+                    # Return a number with Excel's precision.
+                    yield "%.16g" % cell.number
+
+                elif cell_type == "String":
+                    # Return a string from it's shared string index.
+                    yield get_shared_string(cell.string)
+
+                elif cell_type in ("Formula", "ArrayFormula"):
+                    # Return the formula value.
+                    value = cell.value
+
+                    if value is None:
+                        value = 0
+
+                    yield value
+
+                elif cell_type == "Blank":
+                    # Return a empty cell.
+                    yield ""
+
+    def __len__(self):
+        if self.count is None:
+            self.count = sum(1 for _ in self)
+        return self.count
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self)[index]
+
+        if index < 0:
+            index += len(self)
+
+        for i, value in enumerate(self):
+            if i == index:
+                return value
+
+        raise IndexError("RangeData index out of range")
+
 
 ###############################################################################
 #
 # Worksheet Class definition.
 #
 ###############################################################################
+def _coalesce_ranges(ranges):
+    # Merge (first_row, first_col, last_row, last_col) ranges into fewer
+    # rectangles: first ranges with the same columns that touch or overlap
+    # vertically, then ranges with the same rows horizontally. Ranges inside
+    # another range are left out.
+    merged = []
+    for cells in sorted(set(ranges), key=lambda r: (r[1], r[3], r[0], r[2])):
+        if merged:
+            prev = merged[-1]
+            if prev[1] == cells[1] and prev[3] == cells[3] and cells[0] <= prev[2] + 1:
+                merged[-1] = (prev[0], prev[1], max(prev[2], cells[2]), prev[3])
+                continue
+        merged.append(cells)
+
+    coalesced = []
+    for cells in sorted(merged):
+        if coalesced:
+            prev = coalesced[-1]
+            if prev[0] == cells[0] and prev[2] == cells[2] and cells[1] <= prev[3] + 1:
+                coalesced[-1] = (prev[0], prev[1], prev[2], max(prev[3], cells[3]))
+                continue
+        coalesced.append(cells)
+
+    # Drop ranges that lie inside another range. Only ranges of more than
+    # one cell can contain another, since duplicates are already gone.
+    coalesced = set(coalesced)
+    containers = [
+        cells for cells in coalesced if cells[0] != cells[2] or cells[1] != cells[3]
+    ]
+    kept = []
+    for cells in coalesced:
+        if not any(
+            other != cells
+            and other[0] <= cells[0]
+            and other[1] <= cells[1]
+            and cells[2] <= other[2]
+            and cells[3] <= other[3]
+            for other in containers
+        ):
+            kept.append(cells)
+
+    return sorted(kept)
+
+
+def _ranges_overlap(ranges, others):
+    # Check if any of two lists of (first_row, first_col, last_row, last_col)
+    # ranges share a cell.
+    for row_first, col_first, row_last, col_last in ranges:
+        for other in others:
+            if (
+                row_first <= other[2]
+                and other[0] <= row_last
+                and col_first <= other[3]
+                and other[1] <= col_last
+            ):
+                return True
+    return False
+
+
+def _rule_key(options, ignore):
+    # Get a hashable key for the options of a conditional format or data
+    # validation, or None if the rule refers to relative cell positions.
+    key = []
+    for name, value in options.items():
+        if name in ignore:
+            continue
+
+        if isinstance(value, list):
+            values = value
+        else:
+            values = [value]
+
+        for item in values:
+            if isinstance(item, str):
+                item = re_string_literal.sub("", item)
+                if re_relative_ref.search(item):
+                    return None
+
+        key.append((name, repr(value)))
+
+    return tuple(sorted(key))
+
+
+def _pixel_offsets(sizes, size_func, default):
+    # Get the sorted indices of the rows or columns in sizes and the running
+    # total of their pixel size difference from the default size.
+    indices = sorted(sizes.keys())
+    totals = [0]
+    total = 0
+
+    for index in indices:
+        total += size_func(index) - default
+        totals.append(total)
+
+    return indices, totals, default
+
+
+def _offset_pixels(offsets, index):
+    # Get the absolute pixel offset of a row or column from the values
+    # returned by _pixel_offsets().
+    indices, totals, default = offsets
+
+    return default * index + totals[bisect_left(indices, index)]
+
+
 class Worksheet(xmlwriter.XMLwriter):
     """
     A class for writing the Excel XLSX Worksheet file.
@@ -349,6 +570,8 @@ class Worksheet(xmlwriter.XMLwriter):
         self.row_sizes = {}
         self.col_size_changed = False
         self.row_size_changed = False
+        self.col_pixel_offsets = None
+        self.row_pixel_offsets = None
 
         self.last_shape_id = 1
         self.rel_count = 0
@@ -420,6 +643,7 @@ class Worksheet(xmlwriter.XMLwriter):
 
         self.has_dynamic_arrays = False
         self.use_future_functions = False
+        self.coalesce_rules = False
 
     # Utility function for writing different types of strings.
     def _write_token_as_string(self, token, row, col, *args):
@@ -1112,6 +1336,61 @@ class Worksheet(xmlwriter.XMLwriter):
 
         return 0
 
+    @convert_cell_args
+    def write_datetime_column(self, row, col, dates, cell_format=None):
+        """
+        Write a column of dates and/or times starting from (row, col).
+
+        This is a faster equivalent of calling write_datetime() for each
+        value. The values are converted in one pass and share a single
+        format. A NumPy datetime64 or timedelta64 array is converted with
+        array arithmetic. None, or NaT, leaves a blank formatted cell.
+
+        Args:
+            row:         The first cell row (zero indexed).
+            col:         The cell column (zero indexed).
+            dates:       A sequence of datetime objects or a NumPy array.
+            cell_format: A cell Format object.
+
+        Returns:
+            0:  Success.
+            -1: Row or column is out of worksheet bounds.
+
+        """
+        numbers = datetimes_to_excel_datetimes(
+            dates, self.date_1904, self.remove_timezone
+        )
+
+        if not numbers:
+            return 0
+
+        # Add the default date format.
+        if cell_format is None:
+            cell_format = self.default_date_format
+
+        # Check the first and last cells, which also store the dimensions.
+        last_row = row + len(numbers) - 1
+        if self._check_dimensions(row, col) or self._check_dimensions(last_row, col):
+            return -1
+
+        table = self.table
+        constant_memory = self.constant_memory
+        blank = cell_blank_tuple(cell_format)
+
+        for number in numbers:
+            # Write previous row if in in-line string constant_memory mode.
+            if constant_memory and row > self.previous_row:
+                self._write_single_row(row)
+
+            if number is None:
+                if cell_format is not None:
+                    table[row][col] = blank
+            else:
+                table[row][col] = cell_datetime_tuple(number, cell_format)
+            row += 1
+
+        return 0
+
     @convert_cell_args
     def write_boolean(self, row, col, boolean, cell_format=None):
         """
@@ -1708,7 +1987,56 @@ class Worksheet(xmlwriter.XMLwriter):
         self.has_comments = 1
 
         # Store the options of the cell comment, to process on file close.
-        self.comments[row][col] = [row, col, comment, options]
+        self.comments[row][col] = (row, col, comment, options)
+
+        return 0
+
+    def write_comments(self, comments, options=None):
+        """
+        Write comments to several worksheet cells.
+
+        Args:
+            comments: An iterable of (row, col, comment) or (cell, comment)
+                      tuples. A tuple can end with its own options dict.
+            options:  Comment formatting options shared by the comments.
+
+        Returns:
+            0:  Success.
+            -1: Row or column is out of worksheet bounds.
+            -2: String longer than 32k characters.
+
+        """
+        if options is None:
+            options = {}
+
+        table = self.comments
+
+        for item in comments:
+            if isinstance(item[0], str):
+                row, col = xl_cell_to_rowcol_fast(item[0])
+                item = (row, col) + tuple(item[1:])
+            else:
+                row, col = item[0], item[1]
+
+            comment = item[2]
+
+            # Check that row and col are valid and store max and min values
+            if self._check_dimensions(row, col):
+                return -1
+
+            # Check that the comment string is < 32767 chars.
+            if len(comment) > self.xls_strmax:
+                return -2
+
+            # Comments without their own options share the options dict,
+            # so that their formatting is only resolved once on file close.
+            if len(item) > 3 and item[3] is not None:
+                table[row][col] = (row, col, comment, item[3])
+            else:
+                table[row][col] = (row, col, comment, options)
+
+            self.has_vml = 1
+            self.has_comments = 1
 
         return 0
 
@@ -4594,6 +4922,7 @@ class Worksheet(xmlwriter.XMLwriter):
         self.remove_timezone = init_data["remove_timezone"]
         self.max_url_length = init_data["max_url_length"]
         self.use_future_functions = init_data["use_future_functions"]
+        self.coalesce_rules = init_data["coalesce_rules"]
 
         if self.excel2003_style:
             self.original_row_height = 12.75
@@ -5398,7 +5727,9 @@ class Worksheet(xmlwriter.XMLwriter):
             y1 = 0
 
         # Calculate the absolute x offset of the top-left vertex.
-        if self.col_size_changed:
+        if self.col_pixel_offsets is not None:
+            x_abs += _offset_pixels(self.col_pixel_offsets, col_start)
+        elif self.col_size_changed:
             for col_id in range(col_start):
                 x_abs += self._size_col(col_id)
         else:
@@ -5408,7 +5739,9 @@ class Worksheet(xmlwriter.XMLwriter):
         x_abs += x1
 
         # Calculate the absolute y offset of the top-left vertex.
-        if self.row_size_changed:
+        if self.row_pixel_offsets is not None:
+            y_abs += _offset_pixels(self.row_pixel_offsets, row_start)
+        elif self.row_size_changed:
             for row_id in range(row_start):
                 y_abs += self._size_row(row_id)
         else:
@@ -5453,6 +5786,44 @@ class Worksheet(xmlwriter.XMLwriter):
 
         return [col_start, row_start, x1, y1, col_end, row_end, x2, y2, x_abs, y_abs]
 
+    def _get_image_filenames(self):
+        # Get the image files that are read when the worksheet is packaged.
+        filenames = []
+
+        for image in self.images:
+            if not image[10]:
+                filenames.append(image[2])
+
+        for image in self.header_images + self.footer_images:
+            if not image[1]:
+                filenames.append(image[0])
+
+        if self.background_image and not self.background_bytes:
+            filenames.append(self.background_image)
+
+        return filenames
+
+    def _set_pixel_offsets(self):
+        # Precompute the rows and columns whose size differs from the
+        # default so that _position_object_pixels() can find the absolute
+        # offset of a cell without adding up every row and column before it.
+        # Only used while the row and column sizes can't change.
+        if self.col_size_changed:
+            self.col_pixel_offsets = _pixel_offsets(
+                self.col_info, self._size_col, self.default_col_pixels
+            )
+
+        if self.row_size_changed:
+            self.row_pixel_offsets = _pixel_offsets(
+                self.row_sizes,
+                self._size_row,
+                int(4.0 / 3.0 * self.default_row_height),
+            )
+
+    def _clear_pixel_offsets(self):
+        self.col_pixel_offsets = None
+        self.row_pixel_offsets = None
+
     def _size_col(self, col, anchor=0):
         # Convert the width of a cell from character units to pixels. Excel
         # rounds the column width to the nearest pixel. If the width hasn't
@@ -5520,13 +5891,103 @@ class Worksheet(xmlwriter.XMLwriter):
         # Convert the height of a cell from pixels to character units.
         return 0.75 * pixels
 
-    def _comment_params(self, row, col, string, options):
+    def _comment_params(self, row, col, string, options, params=None):
         # This method handles the additional optional parameters to
         # write_comment() as well as calculating the comment object
-        # position and vertices.
+        # position and vertices. The options can be passed in already
+        # resolved by _comment_options() when they are shared.
+        anchor = 0
+
+        if params is None:
+            params = self._comment_options(options)
+
+        # Set the default start cell and offsets for the comment. These are
+        # generally fixed in relation to the parent cell. However there are
+        # some edge cases for cells at the, er, edges.
+        row_max = self.xls_rowmax
+        col_max = self.xls_colmax
+
+        start_row = params["start_row"]
+        start_col = params["start_col"]
+        x_offset = params["x_offset"]
+        y_offset = params["y_offset"]
+
+        if start_row is None:
+            if row == 0:
+                start_row = 0
+            elif row == row_max - 3:
+                start_row = row_max - 7
+            elif row == row_max - 2:
+                start_row = row_max - 6
+            elif row == row_max - 1:
+                start_row = row_max - 5
+            else:
+                start_row = row - 1
+
+        if y_offset is None:
+            if row == 0:
+                y_offset = 2
+            elif row == row_max - 3:
+                y_offset = 16
+            elif row == row_max - 2:
+                y_offset = 16
+            elif row == row_max - 1:
+                y_offset = 14
+            else:
+                y_offset = 10
+
+        if start_col is None:
+            if col == col_max - 3:
+                start_col = col_max - 6
+            elif col == col_max - 2:
+                start_col = col_max - 5
+            elif col == col_max - 1:
+                start_col = col_max - 4
+            else:
+                start_col = col + 1
+
+        if x_offset is None:
+            if col == col_max - 3:
+                x_offset = 49
+            elif col == col_max - 2:
+                x_offset = 49
+            elif col == col_max - 1:
+                x_offset = 49
+            else:
+                x_offset = 15
+
+        # Calculate the positions of the comment object.
+        vertices = self._position_object_pixels(
+            start_col,
+            start_row,
+            x_offset,
+            y_offset,
+            params["width"],
+            params["height"],
+            anchor,
+        )
+
+        # Add the width and height for VML.
+        vertices.append(params["width"])
+        vertices.append(params["height"])
+
+        return [
+            row,
+            col,
+            string,
+            params["author"],
+            params["visible"],
+            params["color"],
+            params["font_name"],
+            params["font_size"],
+            params["font_family"],
+        ] + [vertices]
+
+    def _comment_options(self, options):
+        # Resolve the write_comment() options that don't depend on the
+        # comment cell: the defaults, color, start cell and scaled size.
         default_width = 128
         default_height = 74
-        anchor = 0
 
         params = {
             "author": None,
@@ -5569,56 +6030,6 @@ class Worksheet(xmlwriter.XMLwriter):
             params["start_row"] = start_row
             params["start_col"] = start_col
 
-        # Set the default start cell and offsets for the comment. These are
-        # generally fixed in relation to the parent cell. However there are
-        # some edge cases for cells at the, er, edges.
-        row_max = self.xls_rowmax
-        col_max = self.xls_colmax
-
-        if params["start_row"] is None:
-            if row == 0:
-                params["start_row"] = 0
-            elif row == row_max - 3:
-                params["start_row"] = row_max - 7
-            elif row == row_max - 2:
-                params["start_row"] = row_max - 6
-            elif row == row_max - 1:
-                params["start_row"] = row_max - 5
-            else:
-                params["start_row"] = row - 1
-
-        if params["y_offset"] is None:
-            if row == 0:
-                params["y_offset"] = 2
-            elif row == row_max - 3:
-                params["y_offset"] = 16
-            elif row == row_max - 2:
-                params["y_offset"] = 16
-            elif row == row_max - 1:
-                params["y_offset"] = 14
-            else:
-                params["y_offset"] = 10
-
-        if params["start_col"] is None:
-            if col == col_max - 3:
-                params["start_col"] = col_max - 6
-            elif col == col_max - 2:
-                params["start_col"] = col_max - 5
-            elif col == col_max - 1:
-                params["start_col"] = col_max - 4
-            else:
-                params["start_col"] = col + 1
-
-        if params["x_offset"] is None:
-            if col == col_max - 3:
-                params["x_offset"] = 49
-            elif col == col_max - 2:
-                params["x_offset"] = 49
-            elif col == col_max - 1:
-                params["x_offset"] = 49
-            else:
-                params["x_offset"] = 15
-
         # Scale the size of the comment box if required.
         if params["x_scale"]:
             params["width"] = params["width"] * params["x_scale"]
@@ -5630,32 +6041,7 @@ class Worksheet(xmlwriter.XMLwriter):
         params["width"] = int(0.5 + params["width"])
         params["height"] = int(0.5 + params["height"])
 
-        # Calculate the positions of the comment object.
-        vertices = self._position_object_pixels(
-            params["start_col"],
-            params["start_row"],
-            params["x_offset"],
-            params["y_offset"],
-            params["width"],
-            params["height"],
-            anchor,
-        )
-
-        # Add the width and height for VML.
-        vertices.append(params["width"])
-        vertices.append(params["height"])
-
-        return [
-            row,
-            col,
-            string,
-            params["author"],
-            params["visible"],
-            params["color"],
-            params["font_name"],
-            params["font_size"],
-            params["font_family"],
-        ] + [vertices]
+        return params
 
     def _button_params(self, row, col, options):
         # This method handles the parameters passed to insert_button() as well
@@ -5738,12 +6124,26 @@ class Worksheet(xmlwriter.XMLwriter):
         # testing and set the external links for comments and buttons.
         row_nums = sorted(self.comments.keys())
 
+        # Options dicts shared by several comments, usually from
+        # write_comments(), are only resolved once.
+        resolved_options = {}
+
+        self._set_pixel_offsets()
+
         for row in row_nums:
             col_nums = sorted(self.comments[row].keys())
 
             for col in col_nums:
-                user_options = self.comments[row][col]
-                params = self._comment_params(*user_options)
+                row, col, string, options = self.comments[row][col]
+
+                # The options are kept in the cache so that their id() can't
+                # be reused by another dict.
+                cached = resolved_options.get(id(options))
+                if cached is None:
+                    cached = (options, self._comment_options(options))
+                    resolved_options[id(options)] = cached
+
+                params = self._comment_params(row, col, string, options, cached[1])
                 self.comments[row][col] = params
 
                 # Set comment visibility if required and not user defined.
@@ -5757,6 +6157,8 @@ class Worksheet(xmlwriter.XMLwriter):
 
                 comments.append(self.comments[row][col])
 
+        self._clear_pixel_offsets()
+
         self.external_vml_links.append(
             ["/vmlDrawing", "../drawings/vmlDrawing" + str(vml_drawing_id) + ".vml"]
         )
@@ -5853,56 +6255,14 @@ class Worksheet(xmlwriter.XMLwriter):
 
     def _get_range_data(self, row_start, col_start, row_end, col_end):
         # Returns a range of data from the worksheet _table to be used in
-        # chart cached data. Strings are returned as SST ids and decoded
-        # in the workbook. Return None for data that doesn't exist since
-        # Excel can chart series with data missing.
+        # chart cached data. The data is a lazy RangeData view that is read
+        # from the table when the chart is written, so large series aren't
+        # copied into a list first.
 
         if self.constant_memory:
             return ()
 
-        data = []
-
-        # Iterate through the table data.
-        for row_num in range(row_start, row_end + 1):
-            # Store None if row doesn't exist.
-            if row_num not in self.table:
-                data.append(None)
-                continue
-
-            for col_num in range(col_start, col_end + 1):
-                if col_num in self.table[row_num]:
-                    cell = self.table[row_num][col_num]
-
-                    cell_type = cell.__class__.__name__
-
-                    if cell_type in ("Number", "Datetime"):
-                        # Return a number with Excel's precision.
-                        data.append("%.16g" % cell.number)
-
-                    elif cell_type == "String":
-                        # Return a string from it's shared string index.
-                        index = cell.string
-                        string = self.str_table._get_shared_string(index)
-
-                        data.append(string)
-
-                    elif cell_type in ("Formula", "ArrayFormula"):
-                        # Return the formula value.
-                        value = cell.value
-
-                        if value is None:
-                            value = 0
-
-                        data.append(value)
-
-                    elif cell_type == "Blank":
-                        # Return a empty cell.
-                        data.append("")
-                else:
-                    # Store None if column doesn't exist.
-                    data.append(None)
-
-        return data
+        return RangeData(self, row_start, col_start, row_end, col_end)
 
     def _csv_join(self, *items):
         # Create a csv string for use with data validation formulas and lists.
@@ -6277,6 +6637,46 @@ class Worksheet(xmlwriter.XMLwriter):
 
         self._xml_empty_tag("sheetFormatPr", attributes)
 
+    def _assign_xf_indices(self):
+        # Assign XF indices to the formats used in the worksheet in the same
+        # order that _write_cols() and _write_rows() would. This fixes the
+        # indices before the worksheet XML is written in another process.
+        for col in sorted(self.col_info.keys()):
+            cell_format = self.col_info[col][1]
+            if cell_format:
+                cell_format._get_xf_index()
+
+        if self.dim_rowmin is None:
+            return
+
+        rows = set(self.set_rows) | set(self.comments)
+        rows.update(row for row, cells in self.table.items() if cells)
+
+        for row_num in sorted(rows):
+            if row_num < self.dim_rowmin or row_num > self.dim_rowmax:
+                continue
+
+            properties = self.set_rows.get(row_num)
+            row_format = properties[1] if properties else None
+            if row_format:
+                row_format._get_xf_index()
+
+            row_data = self.table.get(row_num)
+            if not row_data:
+                continue
+
+            for col_num in sorted(row_data.keys()):
+                if col_num < self.dim_colmin or col_num > self.dim_colmax:
+                    continue
+
+                cell = row_data[col_num]
+                if cell.format:
+                    cell.format._get_xf_index()
+                elif not row_format and col_num in self.col_info:
+                    col_format = self.col_info[col_num][1]
+                    if col_format is not None:
+                        col_format._get_xf_index()
+
     def _write_cols(self):
         # Write the <cols> element and <col> sub elements.
 
@@ -6651,31 +7051,21 @@ class Worksheet(xmlwriter.XMLwriter):
         span_max = None
 
         for row_num in range(self.dim_rowmin, self.dim_rowmax + 1):
-            if row_num in self.table:
-                # Calculate spans for cell data.
-                for col_num in range(self.dim_colmin, self.dim_colmax + 1):
-                    if col_num in self.table[row_num]:
-                        if span_min is None:
-                            span_min = col_num
-                            span_max = col_num
-                        else:
-                            if col_num < span_min:
-                                span_min = col_num
-                            if col_num > span_max:
-                                span_max = col_num
-
-            if row_num in self.comments:
-                # Calculate spans for comments.
-                for col_num in range(self.dim_colmin, self.dim_colmax + 1):
-                    if row_num in self.comments and col_num in self.comments[row_num]:
-                        if span_min is None:
-                            span_min = col_num
-                            span_max = col_num
-                        else:
-                            if col_num < span_min:
-                                span_min = col_num
-                            if col_num > span_max:
-                                span_max = col_num
+            # Calculate spans for cell data and comments. The stored columns
+            # are always within the worksheet dimensions.
+            for cols in (self.table.get(row_num), self.comments.get(row_num)):
+                if cols:
+                    col_min = min(cols)
+                    col_max = max(cols)
+
+                    if span_min is None:
+                        span_min = col_min
+                        span_max = col_max
+                    else:
+                        if col_min < span_min:
+                            span_min = col_min
+                        if col_max > span_max:
+                            span_max = col_max
 
             if ((row_num + 1) % 16 == 0) or row_num == self.dim_rowmax:
                 span_index = int(row_num / 16)
@@ -7379,9 +7769,131 @@ class Worksheet(xmlwriter.XMLwriter):
 
         self._xml_empty_tag("picture", attributes)
 
+    def _coalesce_data_validations(self):
+        # Merge identical data validations into one with several cell ranges.
+        if not self.coalesce_rules:
+            return self.validations
+
+        groups = {}
+        validations = []
+
+        for options in self.validations:
+            key = None
+            if "multi_range" not in options:
+                key = _rule_key(options, ("cells",))
+
+            if key is None:
+                validations.append(options)
+            elif key in groups:
+                groups[key]["cells"].extend(options["cells"])
+            else:
+                groups[key] = options.copy()
+                groups[key]["cells"] = list(options["cells"])
+                validations.append(groups[key])
+
+        for options in groups.values():
+            cells = []
+            for row_first, col_first, row_last, col_last in options["cells"]:
+                cells.append(
+                    (
+                        min(row_first, row_last),
+                        min(col_first, col_last),
+                        max(row_first, row_last),
+                        max(col_first, col_last),
+                    )
+                )
+            options["cells"] = _coalesce_ranges(cells)
+
+        return validations
+
+    def _coalesce_conditional_formats(self):
+        # Merge identical conditional format rules on different ranges into
+        # one rule with a multi-area range. Only rules that don't depend on
+        # their position or on the other values in their range are merged.
+        # A merged rule takes the priority of the first of its rules, so a
+        # rule is only merged into an earlier one if no rule with a priority
+        # in between overlaps its range. Otherwise the order in which Excel
+        # applies overlapping rules, and stop_if_true, could change.
+        if not self.coalesce_rules:
+            return self.cond_formats
+
+        rules = []
+        for cond_range in self.cond_formats:
+            for options in self.cond_formats[cond_range]:
+                key = None
+                if options["type"] in COALESCE_CF_TYPES and (
+                    "multi_range" not in options
+                ):
+                    key = _rule_key(options, ("priority",))
+
+                ranges = [
+                    xl_range_to_rowcol_fast(cells) for cells in cond_range.split()
+                ]
+                rules.append((options["priority"], key, cond_range, ranges, options))
+        rules.sort(key=lambda r: r[0])
+
+        groups = {}
+        merged = []
+
+        for index, (_, key, cond_range, ranges, options) in enumerate(rules):
+            group = groups.get(key)
+            if group is not None:
+                # Collect the ranges of the other rules since the group's
+                # last check, with their bounding box to skip most searches.
+                blockers = group["blockers"]
+                for _, other_key, _, other_ranges, _ in rules[group["checked"] : index]:
+                    if other_key != key:
+                        blockers.extend(other_ranges)
+                group["checked"] = index + 1
+
+                if blockers:
+                    bounds = group["bounds"]
+                    for cells in blockers[group["bounded"] :]:
+                        if bounds is None:
+                            bounds = cells
+                        else:
+                            bounds = (
+                                min(bounds[0], cells[0]),
+                                min(bounds[1], cells[1]),
+                                max(bounds[2], cells[2]),
+                                max(bounds[3], cells[3]),
+                            )
+                    group["bounds"] = bounds
+                    group["bounded"] = len(blockers)
+
+                if not blockers or not (
+                    _ranges_overlap(ranges, [group["bounds"]])
+                    and _ranges_overlap(ranges, blockers)
+                ):
+                    group["ranges"].extend(ranges)
+                    continue
+
+            group = {
+                "options": options,
+                "ranges": list(ranges),
+                "cond_range": cond_range,
+                "checked": index + 1,
+                "blockers": [],
+                "bounds": None,
+                "bounded": 0,
+            }
+            merged.append(group)
+            if key is not None:
+                groups[key] = group
+
+        cond_formats = {}
+        for group in merged:
+            cond_range = group["cond_range"]
+            if len(group["ranges"]) > 1:
+                ranges = _coalesce_ranges(group["ranges"])
+                cond_range = " ".join(xl_range(*cells) for cells in ranges)
+            cond_formats.setdefault(cond_range, []).append(group["options"])
+
+        return cond_formats
+
     def _write_data_validations(self):
         # Write the <dataValidations> element.
-        validations = self.validations
+        validations = self._coalesce_data_validations()
         count = len(validations)
 
         if not count:
@@ -7506,15 +8018,14 @@ class Worksheet(xmlwriter.XMLwriter):
 
     def _write_conditional_formats(self):
         # Write the Worksheet conditional formats.
-        ranges = sorted(self.cond_formats.keys())
+        cond_formats = self._coalesce_conditional_formats()
+        ranges = sorted(cond_formats.keys())
 
         if not ranges:
             return
 
         for cond_range in ranges:
-            self._write_conditional_formatting(
-                cond_range, self.cond_formats[cond_range]
-            )
+            self._write_conditional_formatting(cond_range, cond_formats[cond_range])
 
     def _write_conditional_formatting(self, cond_range, params):
         # Write the <conditionalFormatting> element.
@@ -10,7 +10,6 @@
 
 # Standard packages.
 import re
-from io import StringIO
 
 
 class XMLwriter(object):
@@ -31,12 +30,12 @@ class XMLwriter(object):
 
     def _set_xml_writer(self, filename):
         # Set the XML writer filehandle for the object.
-        if isinstance(filename, StringIO):
-            self.internal_fh = False
-            self.fh = filename
-        else:
+        if isinstance(filename, str):
             self.internal_fh = True
             self.fh = open(filename, "w", encoding="utf-8")
+        else:
+            self.internal_fh = False
+            self.fh = filename
 
     def _xml_close(self):
         # Close the XML filehandle if we created it.
@@ -0,0 +1,82 @@
+# Synthetic assemblies built on the fake adsk object model.
+#
+# Every builder returns a Design whose traversal visits roughly the
+# requested number of occurrences.
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fakeadsk'))
+
+import adsk.core, adsk.fusion
+
+MATERIALS = ['Steel', 'Aluminum 6061', 'ABS Plastic', 'Brass', 'Nylon 6/6']
+
+def _part(design, index):
+    return design.newComponent('Part %d' % index, MATERIALS[index % len(MATERIALS)])
+
+def _place(parent, component, index):
+    transform = adsk.core.Matrix3D.create()
+    transform.translation = adsk.core.Vector3D.create(index % 100, index // 100, 0)
+    return parent.occurrences.addExistingComponent(component, transform)
+
+def wide(occurrences, unique=None):
+    # A flat assembly: every occurrence sits directly under the root and
+    # they cycle through `unique` components.
+    unique = unique or max(1, occurrences // 10)
+    design = adsk.fusion.Design('Wide %d' % occurrences)
+    parts = [_part(design, i) for i in range(unique)]
+    for i in range(occurrences):
+        _place(design.rootComponent, parts[i % unique], i)
+    return design
+
+def deep(occurrences, depth=50):
+    # A chain of `depth` nested subassemblies, each holding a share of
+    # unique leaf parts.
+    design = adsk.fusion.Design('Deep %d' % occurrences)
+    perLevel = max(1, occurrences // depth - 1)
+    parent = design.rootComponent
+    index = 0
+    for level in range(depth):
+        for _ in range(perLevel):
+            _place(parent, _part(design, index), index)
+            index += 1
+        subassembly = design.newComponent('Level %d' % level)
+        _place(parent, subassembly, index)
+        parent = subassembly
+    return design
+
+def instanced(occurrences, partsPerModule=20, uniquePerModule=5):
+    # Few unique components, many instances: a module subassembly full of
+    # repeated hardware is placed over and over under the root.
+    design = adsk.fusion.Design('Instanced %d' % occurrences)
+    module = design.newComponent('Module')
+    hardware = [_part(design, i) for i in range(uniquePerModule)]
+    for i in range(partsPerModule):
+        _place(module, hardware[i % uniquePerModule], i)
+    for i in range(max(1, occurrences // (partsPerModule + 1))):
+        _place(design.rootComponent, module, i)
+    return design
+
+def referenceParts(design):
+    # Mark every part as inserted from a library document, as standard
+    # hardware is, so it has an identity that holds across projects.
+    for component in design.allComponents:
+        if component.material is not None:
+            dataFile = adsk.core.DataFile('urn:library:' + component.name, 3)
+            component.documentReference = adsk.core.DocumentReference(dataFile)
+    return design
+
+SHAPES = {
+    'wide': wide,
+    'deep': deep,
+    'instanced': instanced,
+}
+
+def countOccurrences(occurrences):
+    total = 0
+    for occ in occurrences:
+        total += 1
+        if occ.childOccurrences:
+            total += countOccurrences(occ.childOccurrences)
+    return total
@@ -0,0 +1,153 @@
+# Times BOMshot extraction on synthetic assemblies using the fake adsk API.
+#
+#   python benchmarks/bench_bomshot.py [--full] [--compare benchmarks/baseline_bomshot.json]
+#
+# Per-phase times come from BOMshot's own trace spans: traversal (the
+# occurrence walk that deduplicates components and plans the output paths,
+# so it is also the dedup time), capture (takePhoto), export (the batched
+# export phase) and buildXLSX.
+
+import importlib
+import os
+import shutil
+import sys
+import tempfile
+import types
+
+import harness
+import assemblies
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def loadBOMshot():
+    # BOMshot uses a relative import for its vendored modules, so load it as
+    # a submodule of a package rooted at the repository, as Fusion does.
+    if 'bomshot' not in sys.modules:
+        package = types.ModuleType('bomshot')
+        package.__path__ = [REPO]
+        sys.modules['bomshot'] = package
+    return importlib.import_module('bomshot.BOMshot')
+
+def spanTotals(trace):
+    totals = {}
+    for event in trace['traceEvents']:
+        if event['ph'] == 'X':
+            totals[event['name']] = totals.get(event['name'], 0.0) + event['dur'] / 1000000.0
+    return totals
+
+def extraction(shape, occurrences, exportFormats=(), sharedCache=False, dataOnly=False, allSheets=False,
+               cancelAfter=None, revision=False):
+    design = assemblies.SHAPES[shape](occurrences)
+    outputDir = tempfile.mkdtemp(prefix='bomshot-bench-')
+    try:
+        app = assemblies.adsk.core.Application.get()
+        app.activeProduct = design
+
+        BOMshot = loadBOMshot()
+        bom = BOMshot.BOM()
+        bom.exportStep = 'step' in exportFormats
+        bom.exportStl = 'stl' in exportFormats
+        bom.export3MF = '3mf' in exportFormats
+        bom.dataOnly = dataOnly
+        bom.indentedBOM = bom.subassemblySheets = allSheets
+        if sharedCache:
+            # Library parts: a first project fills the cache, the measured
+            # second project takes its thumbnails and exports from it.
+            assemblies.referenceParts(design)
+            bom.cacheDirectory = os.path.join(outputDir, 'cache')
+            os.makedirs(os.path.join(outputDir, 'first'))
+            app.userInterface.saveFilename = os.path.join(outputDir, 'first', 'bench.xlsx')
+            bom.extractBOM()
+        app.userInterface.saveFilename = os.path.join(outputDir, 'bench.xlsx')
+        if revision:
+            # A previous release of the same file; then one library part
+            # in twenty gets a new version.
+            assemblies.referenceParts(design)
+            bom.extractBOM()
+            parts = [component for component in design.allComponents if component.material is not None]
+            for component in parts[::20]:
+                component.documentReference.dataFile.versionNumber += 1
+        if cancelAfter is not None:
+            # A run cancelled after this many progress updates; the measured
+            # run resumes it from its checkpoint.
+            app.userInterface.cancelProgressAfter = cancelAfter
+            bom.extractBOM()
+            app.userInterface.cancelProgressAfter = None
+        with harness.Timer() as total:
+            bom.extractBOM()
+
+        totals = spanTotals(BOMshot.tracer.toJSON())
+        capture = totals.get('takePhoto', 0.0)
+        export = totals.get('exports', 0.0)
+        return {
+            'occurrences': assemblies.countOccurrences(design.rootComponent.occurrences),
+            'total_s': round(total.seconds, 4),
+            'traversal_s': round(totals.get('traversal', 0.0), 4),
+            'capture_s': round(capture, 4),
+            'export_s': round(export, 4),
+            'buildXLSX_s': round(totals.get('buildXLSX', 0.0), 4),
+        }
+    finally:
+        shutil.rmtree(outputDir, ignore_errors=True)
+
+def _designFile(shape, occurrences, index, library):
+    name = '%s %d-%d' % (shape.capitalize(), occurrences, index)
+    def product():
+        design = assemblies.SHAPES[shape](occurrences)
+        design.rootComponent.name = name
+        return assemblies.referenceParts(design) if library else design
+    return assemblies.adsk.core.DataFile('urn:design:%d' % index, 1, name, 'f3d', product)
+
+def batch(shape, occurrences, designs, sharedCache=False, physical=False):
+    # A project folder of designs extracted in one session. With the shared
+    # cache their parts come from one library, as standard hardware does,
+    # and every design after the first takes them from the cache. With
+    # physical properties a first batch fills the property cache and the
+    # measured one reuses it.
+    folder = assemblies.adsk.core.DataFolder('Released', [
+        _designFile(shape, occurrences, index, sharedCache) for index in range(designs)])
+    outputDir = tempfile.mkdtemp(prefix='bomshot-bench-')
+    try:
+        BOMshot = loadBOMshot()
+        bom = BOMshot.BOM()
+        if sharedCache:
+            bom.cacheDirectory = os.path.join(outputDir, 'cache')
+        if physical:
+            bom.physicalProperties = True
+            bom.propertyCacheFile = os.path.join(outputDir, 'properties.json')
+            bom.extractBatch(BOMshot.designFiles(folder), os.path.join(outputDir, 'first'))
+        with harness.Timer() as total:
+            summary = bom.extractBatch(BOMshot.designFiles(folder), os.path.join(outputDir, 'out'))
+        statuses = set(row[2] for row in summary)
+        if statuses != {'ok'}:
+            raise RuntimeError('batch failed: %s' % ', '.join(sorted(statuses)))
+        return {
+            'designs': len(summary),
+            'total_s': round(total.seconds, 4),
+            'per_design_s': round(total.seconds / len(summary), 4),
+            'capture_s': round(sum(row[5] for row in summary), 4),
+            'physical_s': round(sum(row[7] for row in summary), 4),
+            'buildXLSX_s': round(sum(row[8] for row in summary), 4),
+        }
+    finally:
+        shutil.rmtree(outputDir, ignore_errors=True)
+
+def cases(full):
+    sizes = [1000, 10000] + ([100000] if full else [])
+    for shape in sorted(assemblies.SHAPES):
+        for size in sizes:
+            yield ('%s-%d' % (shape, size), 'bench_bomshot', 'extraction', (shape, size))
+    yield ('deep-1000-all-sheets', 'bench_bomshot', 'extraction', ('deep', 1000, (), False, False, True))
+    yield ('deep-1000-resumed', 'bench_bomshot', 'extraction', ('deep', 1000, (), False, False, False, 20))
+    yield ('wide-1000-step-revision', 'bench_bomshot', 'extraction', ('wide', 1000, ('step',), False, False, False, None, True))
+    yield ('wide-10000-data-only', 'bench_bomshot', 'extraction', ('wide', 10000, (), False, True))
+    yield ('wide-1000-step', 'bench_bomshot', 'extraction', ('wide', 1000, ('step',)))
+    yield ('wide-1000-step-cached', 'bench_bomshot', 'extraction', ('wide', 1000, ('step',), True))
+    yield ('batch-5x-wide-1000', 'bench_bomshot', 'batch', ('wide', 1000, 5))
+    yield ('batch-5x-wide-1000-cached', 'bench_bomshot', 'batch', ('wide', 1000, 5, True))
+    yield ('batch-5x-wide-1000-physical', 'bench_bomshot', 'batch', ('wide', 1000, 5, False, True))
+    yield ('wide-1000-step-stl-3mf', 'bench_bomshot', 'extraction', ('wide', 1000, ('step', 'stl', '3mf')))
+
+if __name__ == '__main__':
+    options = harness.argumentParser('BOMshot extraction benchmarks').parse_args()
+    sys.exit(harness.main('bomshot', cases(options.full), options))
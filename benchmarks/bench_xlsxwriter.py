@@ -0,0 +1,180 @@
+# Micro and macro benchmarks for the vendored xlsxwriter.
+#
+#   python benchmarks/bench_xlsxwriter.py [--full] [--compare benchmarks/baseline_xlsxwriter.json]
+#
+# Every case writes a real workbook to a temporary file in a fresh process.
+# write_s is the time spent in the worksheet calls, close_s the time spent
+# in Workbook.close(), ops_per_s the throughput of the call under test and
+# rss_mb_per_mcell the peak memory growth scaled to a million cells.
+
+import datetime
+import os
+import shutil
+import sys
+import tempfile
+
+import harness
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO, 'Modules'))
+
+import xlsxwriter
+
+IMAGE = os.path.join(REPO, 'resources', 'Icon_128.png')
+COLUMNS = 10
+WORDS = ['Steel', 'Aluminum', 'Bracket', 'M4x12 Screw', 'Bearing 608', 'Extrusion 2020']
+
+class _Workbook:
+    # Creates a workbook in a scratch directory and measures its close().
+    def __init__(self, options=None):
+        self.directory = tempfile.mkdtemp(prefix='xlsxwriter-bench-')
+        self.filename = os.path.join(self.directory, 'bench.xlsx')
+        self.workbook = xlsxwriter.Workbook(self.filename, options or {})
+
+    def close(self):
+        try:
+            with harness.Timer() as timer:
+                self.workbook.close()
+            return timer.seconds
+        finally:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+def _metrics(operations, write, close, cells=None, rssBefore=None):
+    metrics = {
+        'operations': operations,
+        'write_s': round(write, 4),
+        'close_s': round(close, 4),
+        'ops_per_s': round(operations / write) if write else 0,
+    }
+    rssAfter = harness.peakRSS()
+    if cells and rssBefore is not None:
+        metrics['rss_mb_per_mcell'] = round((rssAfter - rssBefore) / 1048576.0 * 1000000.0 / cells, 2)
+    return metrics
+
+def write_number(cells):
+    rssBefore = harness.peakRSS()
+    book = _Workbook()
+    sheet = book.workbook.add_worksheet()
+    with harness.Timer() as timer:
+        for row in range(cells // COLUMNS):
+            for col in range(COLUMNS):
+                sheet.write_number(row, col, row * 0.5 + col)
+    return _metrics(cells, timer.seconds, book.close(), cells, rssBefore)
+
+def write_string(cells):
+    rssBefore = harness.peakRSS()
+    book = _Workbook()
+    sheet = book.workbook.add_worksheet()
+    with harness.Timer() as timer:
+        for row in range(cells // COLUMNS):
+            for col in range(COLUMNS):
+                sheet.write_string(row, col, WORDS[(row + col) % len(WORDS)])
+    return _metrics(cells, timer.seconds, book.close(), cells, rssBefore)
+
+def write_row(cells):
+    rssBefore = harness.peakRSS()
+    book = _Workbook()
+    sheet = book.workbook.add_worksheet()
+    data = [1, 2.5, 'Part', 'Steel', 4, 5.25, 'Bracket', 7, 8, 'Notes']
+    rows = cells // COLUMNS
+    with harness.Timer() as timer:
+        for row in range(rows):
+            sheet.write_row(row, 0, data)
+    return _metrics(rows, timer.seconds, book.close(), cells, rssBefore)
+
+def write_datetime_column(cells):
+    book = _Workbook()
+    sheet = book.workbook.add_worksheet()
+    start = datetime.datetime(2024, 1, 1)
+    dates = [start + datetime.timedelta(seconds=15 * i) for i in range(cells)]
+    with harness.Timer() as timer:
+        sheet.write_datetime_column(0, 0, dates)
+    return _metrics(cells, timer.seconds, book.close())
+
+def merge_range(count):
+    book = _Workbook()
+    sheet = book.workbook.add_worksheet()
+    bold = book.workbook.add_format({'bold': True, 'border': 1})
+    with harness.Timer() as timer:
+        for row in range(count):
+            sheet.merge_range('C%d:J%d' % (row + 1, row + 1), 'Merged', bold)
+    return _metrics(count, timer.seconds, book.close())
+
+def insert_image(count):
+    book = _Workbook()
+    sheet = book.workbook.add_worksheet()
+    with harness.Timer() as timer:
+        for row in range(count):
+            sheet.set_row_pixels(row, 70)
+            sheet.insert_image(row, 1, IMAGE, {'x_scale': 0.5, 'y_scale': 0.5})
+    return _metrics(count, timer.seconds, book.close())
+
+def autofit(cells):
+    book = _Workbook()
+    sheet = book.workbook.add_worksheet()
+    for row in range(cells // COLUMNS):
+        for col in range(COLUMNS):
+            sheet.write(row, col, WORDS[(row * col) % len(WORDS)] if col % 2 else row * 1.5)
+    with harness.Timer() as timer:
+        sheet.autofit()
+    return _metrics(cells, timer.seconds, book.close())
+
+def conditional_format(count):
+    book = _Workbook({'coalesce_rules': True})
+    sheet = book.workbook.add_worksheet()
+    red = book.workbook.add_format({'bg_color': '#FFC7CE', 'font_color': '#9C0006'})
+    with harness.Timer() as timer:
+        for row in range(count):
+            sheet.write_number(row, 0, row % 7)
+            sheet.conditional_format(row, 0, row, 0,
+                                     {'type': 'cell', 'criteria': '<', 'value': 3, 'format': red})
+    return _metrics(count, timer.seconds, book.close())
+
+def write_comments(count):
+    # Review notes on a sheet with a few resized rows, written in bulk.
+    book = _Workbook()
+    sheet = book.workbook.add_worksheet()
+    for row in range(0, count, 100):
+        sheet.set_row(row, 30)
+    notes = [(row, row % COLUMNS, 'Check part %d' % row) for row in range(count)]
+    with harness.Timer() as timer:
+        sheet.write_comments(notes, {'author': 'Review'})
+    return _metrics(count, timer.seconds, book.close())
+
+def close(mode, cells):
+    # Mixed numbers, shared strings and formats, closed in the given mode.
+    rssBefore = harness.peakRSS()
+    options = {}
+    if mode != 'normal':
+        options[mode] = True
+    book = _Workbook(options)
+    sheet = book.workbook.add_worksheet()
+    centered = book.workbook.add_format({'align': 'center'})
+    with harness.Timer() as timer:
+        for row in range(cells // COLUMNS):
+            for col in range(COLUMNS):
+                if col % 3 == 0:
+                    sheet.write_string(row, col, WORDS[row % len(WORDS)], centered)
+                else:
+                    sheet.write_number(row, col, row + col)
+    return _metrics(cells, timer.seconds, book.close(), cells, rssBefore)
+
+def cases(full):
+    scale = 10 if full else 1
+    cells = 200000 * scale
+    module = 'bench_xlsxwriter'
+    yield ('write_number-%d' % cells, module, 'write_number', (cells,))
+    yield ('write_string-%d' % cells, module, 'write_string', (cells,))
+    yield ('write_row-%d' % cells, module, 'write_row', (cells,))
+    yield ('write_datetime_column-%d' % cells, module, 'write_datetime_column', (cells,))
+    yield ('merge_range-%d' % (5000 * scale), module, 'merge_range', (5000 * scale,))
+    yield ('insert_image-%d' % (1000 * scale), module, 'insert_image', (1000 * scale,))
+    yield ('autofit-%d' % (cells // 2), module, 'autofit', (cells // 2,))
+    yield ('conditional_format-%d' % (5000 * scale), module, 'conditional_format', (5000 * scale,))
+    yield ('write_comments-%d' % (5000 * scale), module, 'write_comments', (5000 * scale,))
+    for mode in ('normal', 'constant_memory', 'in_memory'):
+        yield ('close-%s-%d' % (mode, cells), module, 'close', (mode, cells))
+
+if __name__ == '__main__':
+    options = harness.argumentParser('xlsxwriter benchmarks').parse_args()
+    sys.exit(harness.main('xlsxwriter', cases(options.full), options))
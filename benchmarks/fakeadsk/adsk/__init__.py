@@ -0,0 +1,23 @@
+# Pure-Python stand-in for the subset of the Fusion 360 API used by BOMshot.
+#
+# Put the directory containing this package on sys.path before importing
+# BOMshot and it will run on a plain Python install. Nothing is rendered or
+# exported for real: viewport captures write a blank PNG of the requested
+# size and exports write a small placeholder file, so the benchmarks measure
+# BOMshot's own work plus the file system traffic it generates.
+
+from . import core, fusion
+
+events = 0
+terminated = False
+
+def doEvents():
+    global events
+    events += 1
+
+def autoTerminate(value):
+    pass
+
+def terminate():
+    global terminated
+    terminated = True
@@ -0,0 +1,376 @@
+# Fake adsk.core: application, viewport, camera, dialogs and command inputs.
+
+import os
+import struct
+import zlib
+
+class Base:
+    @classmethod
+    def cast(cls, obj):
+        return obj if isinstance(obj, cls) else None
+
+class Collection(Base):
+    def __init__(self, items=None):
+        self._items = list(items) if items is not None else []
+
+    @property
+    def count(self):
+        return len(self._items)
+
+    def item(self, index):
+        return self._items[index] if 0 <= index < len(self._items) else None
+
+    def __getitem__(self, index):
+        return self._items[index]
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+class DialogResults:
+    DialogOK = 0
+    DialogCancel = 1
+    DialogYes = 2
+    DialogNo = 3
+    DialogError = -1
+
+class MessageBoxButtonTypes:
+    OKButtonType = 0
+    OKCancelButtonType = 1
+    YesNoButtonType = 4
+
+class MessageBoxIconTypes:
+    NoIconIconType = 0
+    InformationIconType = 1
+    WarningIconType = 3
+
+class Point3D(Base):
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        self.x = x
+        self.y = y
+        self.z = z
+
+    @staticmethod
+    def create(x=0.0, y=0.0, z=0.0):
+        return Point3D(x, y, z)
+
+class Vector3D(Point3D):
+    @staticmethod
+    def create(x=0.0, y=0.0, z=0.0):
+        return Vector3D(x, y, z)
+
+class BoundingBox3D(Base):
+    def __init__(self, minPoint, maxPoint):
+        self.minPoint = minPoint
+        self.maxPoint = maxPoint
+
+class Matrix3D(Base):
+    def __init__(self, translation=None):
+        self.translation = translation or Vector3D()
+
+    @staticmethod
+    def create():
+        return Matrix3D()
+
+class Camera(Base):
+    def __init__(self):
+        self.target = Point3D()
+        self.eye = Point3D(100, -100, 100)
+        self.isFitView = False
+        self.isSmoothTransition = True
+
+    def _copy(self):
+        camera = Camera()
+        camera.__dict__.update(self.__dict__)
+        return camera
+
+_pngCache = {}
+
+def blankPNG(width, height):
+    # A valid greyscale PNG so xlsxwriter can read the image header.
+    key = (width, height)
+    if key not in _pngCache:
+        def chunk(kind, data):
+            return (struct.pack('>I', len(data)) + kind + data +
+                    struct.pack('>I', zlib.crc32(kind + data) & 0xFFFFFFFF))
+        header = struct.pack('>IIBBBBB', width, height, 8, 0, 0, 0, 0)
+        pixels = zlib.compress(b'\x00' * ((width + 1) * height), 9)
+        _pngCache[key] = (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) +
+                          chunk(b'IDAT', pixels) + chunk(b'IEND', b''))
+    return _pngCache[key]
+
+class Viewport(Base):
+    def __init__(self):
+        self._camera = Camera()
+        self.refreshCount = 0
+        self.imageCount = 0
+
+    @property
+    def camera(self):
+        return self._camera._copy()
+
+    @camera.setter
+    def camera(self, value):
+        self._camera = value._copy()
+
+    def refresh(self):
+        self.refreshCount += 1
+
+    def saveAsImageFile(self, filename, width, height):
+        # Fusion creates missing folders for the image; BOMshot relies on it.
+        try:
+            os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+            with open(filename, 'wb') as image:
+                image.write(blankPNG(width, height))
+        except OSError:
+            return False
+        self.imageCount += 1
+        return True
+
+class DataFile(Base):
+    def __init__(self, id, versionNumber=1, name='', fileExtension='f3d', product=None):
+        self.id = id
+        self.versionNumber = versionNumber
+        self.name = name
+        self.fileExtension = fileExtension
+        self.parentFolder = None
+        # Fake-only: a function building the product opened from the file.
+        self._product = product
+
+class DataFolder(Base):
+    def __init__(self, name, dataFiles=(), dataFolders=()):
+        self.name = name
+        self.dataFiles = Collection(dataFiles)
+        self.dataFolders = Collection(dataFolders)
+        for dataFile in self.dataFiles:
+            dataFile.parentFolder = self
+
+class Products(Collection):
+    def itemByProductType(self, productType):
+        for product in self._items:
+            if type(product).__name__ + 'ProductType' == productType:
+                return product
+        return None
+
+class Document(Base):
+    def __init__(self, app, product, dataFile=None):
+        self._app = app
+        self.dataFile = dataFile
+        self.name = dataFile.name if dataFile else product.rootComponent.name
+        self.products = Products([product])
+        self.isValid = True
+        self.isModified = False
+        product.parentDocument = self
+
+    def activate(self):
+        self._app.activeDocument = self
+        self._app.activeProduct = self.products[0]
+        return True
+
+    def close(self, saveChanges=True):
+        self.isValid = False
+        self._app.documents._items.remove(self)
+        if self._app.activeDocument is self:
+            self._app.activeDocument = None
+            self._app.activeProduct = None
+        return True
+
+class Documents(Collection):
+    def __init__(self, app):
+        super().__init__()
+        self._app = app
+        self.openCount = 0
+
+    def open(self, dataFile, visible=True):
+        document = Document(self._app, dataFile._product(), dataFile)
+        self._items.append(document)
+        self.openCount += 1
+        document.activate()
+        return document
+
+class DocumentReference(Base):
+    def __init__(self, dataFile):
+        self.dataFile = dataFile
+
+class ListItem(Base):
+    def __init__(self, name, isSelected=False):
+        self.name = name
+        self.isSelected = isSelected
+
+class ListControlDefinition(Base):
+    def __init__(self, items):
+        self.listItems = Collection(items)
+
+class CommandDefinition(Base):
+    def __init__(self, id, controlDefinition=None):
+        self.id = id
+        self.controlDefinition = controlDefinition
+
+class CommandDefinitions(Collection):
+    def __init__(self):
+        super().__init__()
+        self._byId = {}
+
+    def itemById(self, id):
+        return self._byId.get(id)
+
+    def _add(self, definition):
+        self._items.append(definition)
+        self._byId[definition.id] = definition
+        return definition
+
+    def addButtonDefinition(self, id, name, tooltip, resourceFolder=''):
+        return self._add(CommandDefinition(id))
+
+class FileDialog(Base):
+    def __init__(self, ui):
+        self._ui = ui
+        self.isMultiSelectEnabled = False
+        self.title = ''
+        self.filter = ''
+        self.filterIndex = 0
+        self.initialFilename = ''
+        self.initialDirectory = ''
+        self.filename = ''
+        self.filenames = []
+
+    def _show(self):
+        if self._ui.saveFilename is None:
+            return DialogResults.DialogCancel
+        self.filename = self._ui.saveFilename
+        self.filenames = [self.filename]
+        return DialogResults.DialogOK
+
+    def showSave(self):
+        return self._show()
+
+    def showOpen(self):
+        return self._show()
+
+class FolderDialog(Base):
+    def __init__(self, ui):
+        self._ui = ui
+        self.title = ''
+        self.initialDirectory = ''
+        self.folder = ''
+
+    def showDialog(self):
+        if self._ui.folderName is None:
+            return DialogResults.DialogCancel
+        self.folder = self._ui.folderName
+        return DialogResults.DialogOK
+
+class ProgressDialog(Base):
+    def __init__(self, ui):
+        self._ui = ui
+        self.title = ''
+        self.message = ''
+        self.minimumValue = 0
+        self.maximumValue = 100
+        self.isCancelButtonShown = True
+        self.isShowing = False
+        self.updates = 0
+        self._progressValue = 0
+
+    @property
+    def progressValue(self):
+        return self._progressValue
+
+    @progressValue.setter
+    def progressValue(self, value):
+        self._progressValue = value
+        self.updates += 1
+
+    @property
+    def wasCancelled(self):
+        # Pressing Cancel is simulated after a number of updates.
+        cancelAfter = self._ui.cancelProgressAfter
+        return cancelAfter is not None and self.updates > cancelAfter
+
+    def show(self, title, message, minimumValue, maximumValue, delay=0):
+        self.title = title
+        self.message = message
+        self.minimumValue = minimumValue
+        self.maximumValue = maximumValue
+        self.isShowing = True
+        return True
+
+    def hide(self):
+        self.isShowing = False
+        return True
+
+class UserInterface(Base):
+    def __init__(self):
+        self.commandDefinitions = CommandDefinitions()
+        grid = ListControlDefinition([ListItem('Layout Grid', True)])
+        self.commandDefinitions._add(CommandDefinition('ViewLayoutGridCommand', grid))
+        # What the next file dialog returns; None cancels it.
+        self.saveFilename = None
+        # What the next folder dialog returns; None cancels it.
+        self.folderName = None
+        # What message boxes return; Cancel keeps BOMshot from opening files.
+        self.messageBoxResult = DialogResults.DialogCancel
+        self.messages = []
+        # Progress dialogs report Cancel after this many updates; None never.
+        self.cancelProgressAfter = None
+
+    def messageBox(self, text, title='', buttons=0, icon=0):
+        self.messages.append((title, text))
+        return self.messageBoxResult
+
+    def createFileDialog(self):
+        return FileDialog(self)
+
+    def createFolderDialog(self):
+        return FolderDialog(self)
+
+    def createProgressDialog(self):
+        return ProgressDialog(self)
+
+class NamedValues(Base):
+    def __init__(self):
+        self._values = {}
+
+    @staticmethod
+    def create():
+        return NamedValues()
+
+    def add(self, name, value):
+        self._values[name] = value
+        return True
+
+class Event(Base):
+    def __init__(self):
+        self.handlers = []
+
+    def add(self, handler):
+        self.handlers.append(handler)
+        return True
+
+class EventHandler:
+    def __init__(self):
+        pass
+
+class CommandEventHandler(EventHandler):
+    pass
+
+class CommandCreatedEventHandler(EventHandler):
+    pass
+
+class Application(Base):
+    _instance = None
+
+    def __init__(self):
+        self.userInterface = UserInterface()
+        self.activeViewport = Viewport()
+        self.activeProduct = None
+        self.activeDocument = None
+        self.documents = Documents(self)
+
+    @staticmethod
+    def get():
+        if Application._instance is None:
+            Application._instance = Application()
+        return Application._instance
@@ -0,0 +1,143 @@
+# Fake adsk.fusion: design, components, occurrences, materials and exports.
+
+import os
+
+from . import core
+
+class Material(core.Base):
+    def __init__(self, name):
+        self.name = name
+
+class CalculationAccuracy:
+    LowCalculationAccuracy = 0
+    MediumCalculationAccuracy = 1
+    HighCalculationAccuracy = 2
+    VeryHighCalculationAccuracy = 3
+
+class PhysicalProperties(core.Base):
+    def __init__(self, mass, volume, area):
+        self.mass = mass
+        self.volume = volume
+        self.area = area
+
+class Occurrence(core.Base):
+    def __init__(self, component, transform=None):
+        self.component = component
+        self.transform = transform or core.Matrix3D()
+        self.isIsolated = False
+        self.isLightBulbOn = True
+
+    @property
+    def isReferencedComponent(self):
+        return self.component.documentReference is not None
+
+    @property
+    def documentReference(self):
+        return self.component.documentReference
+
+    @property
+    def name(self):
+        return self.component.name
+
+    @property
+    def childOccurrences(self):
+        # Fusion hands out proxies here; sharing the component's own
+        # collection gives the same traversal shape for far less memory.
+        return self.component.occurrences
+
+class Occurrences(core.Collection):
+    def addExistingComponent(self, component, transform=None):
+        occurrence = Occurrence(component, transform)
+        self._items.append(occurrence)
+        return occurrence
+
+class Component(core.Base):
+    physicalPropertiesCount = 0
+
+    def __init__(self, design, name, material=None):
+        # Ids are stable when the same design is built again, as Fusion's
+        # are when a document is reopened.
+        design._lastComponentId += 1
+        self.id = 'component-%d' % design._lastComponentId
+        self.parentDesign = design
+        self.name = name
+        self.material = material
+        self.occurrences = Occurrences()
+        self.isBodiesFolderLightBulbOn = True
+        # Fake-only: set for components inserted from another document.
+        self.documentReference = None
+        # Fake-only: bumped to model an edit of the component.
+        self.revision = 1
+
+    @property
+    def revisionId(self):
+        return '%s/%s/%d' % (self.parentDesign.rootComponent.name, self.id, self.revision)
+
+    def getPhysicalProperties(self, accuracy=CalculationAccuracy.LowCalculationAccuracy):
+        # A solid block sized by the component number, 1 g/cm^3; Fusion
+        # reports kg, cm^3 and cm^2.
+        Component.physicalPropertiesCount += 1
+        x, y, z = self._size()
+        return PhysicalProperties(x * y * z / 1000.0, x * y * z, 2 * (x * y + y * z + x * z))
+
+    @property
+    def boundingBox(self):
+        x, y, z = self._size()
+        return core.BoundingBox3D(core.Point3D(), core.Point3D(x, y, z))
+
+    def _size(self):
+        number = int(self.id.rsplit('-', 1)[1])
+        return (1.0 + number % 7, 2.0 + number % 5, 0.5 + number % 3)
+
+class ExportOptions(core.Base):
+    def __init__(self, filename, geometry):
+        self.filename = filename
+        self.geometry = geometry
+
+class STEPExportOptions(ExportOptions):
+    content = 'ISO-10303-21;\n/* %s */\nEND-ISO-10303-21;\n'
+
+class STLExportOptions(ExportOptions):
+    content = 'solid %s\nendsolid\n'
+
+class C3MFExportOptions(ExportOptions):
+    content = '<model><!-- %s --></model>\n'
+
+class ExportManager(core.Base):
+    def __init__(self):
+        self.exportCount = 0
+
+    def createSTEPExportOptions(self, filename, geometry=None):
+        return STEPExportOptions(filename, geometry)
+
+    # STL and 3MF take the geometry first, as in Fusion.
+    def createSTLExportOptions(self, geometry, filename=''):
+        return STLExportOptions(filename, geometry)
+
+    def createC3MFExportOptions(self, geometry, filename=''):
+        return C3MFExportOptions(filename, geometry)
+
+    def execute(self, options):
+        with open(options.filename, 'w') as exported:
+            exported.write(options.content % options.geometry.name)
+        self.exportCount += 1
+        return True
+
+class Design(core.Base):
+    def __init__(self, rootName='Root'):
+        self.exportManager = ExportManager()
+        self._lastComponentId = 0
+        self.rootComponent = Component(self, rootName)
+        self.activeComponent = self.rootComponent
+        self.allComponents = core.Collection([self.rootComponent])
+        self.parentDocument = None
+
+    def activateRootComponent(self):
+        self.activeComponent = self.rootComponent
+        return True
+
+    def newComponent(self, name, material=None):
+        # Fake-only helper; Fusion creates components through occurrences.
+        component = Component(self, name, Material(material) if material else None)
+        self.allComponents._items.append(component)
+        return component
@@ -0,0 +1,134 @@
+# Shared benchmark runner: runs cases in fresh processes, records metrics and
+# compares them against a stored JSON baseline.
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+class Timer:
+    # with Timer() as t: ...; t.seconds
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self._start
+        return False
+
+def peakRSS():
+    # Peak resident set size of this process in bytes, or None if unknown.
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def _runCase(queue, module, caseName, args):
+    try:
+        sys.path[:0] = [os.path.dirname(os.path.abspath(__file__))]
+        case = getattr(__import__(module), caseName)
+        rssBefore = peakRSS()
+        metrics = case(*args)
+        rssAfter = peakRSS()
+        if rssBefore is not None:
+            metrics['peak_rss_mb'] = round((rssAfter - rssBefore) / 1048576.0, 2)
+        queue.put(('ok', metrics))
+    except BaseException as exc:
+        queue.put(('error', '%s: %s' % (type(exc).__name__, exc)))
+
+def runIsolated(module, caseName, *args):
+    # Run one case in a fresh interpreter so memory and caches are not shared.
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_runCase, args=(queue, module, caseName, args))
+    process.start()
+    status, payload = queue.get()
+    process.join()
+    if status != 'ok':
+        raise RuntimeError('%s%r failed: %s' % (caseName, args, payload))
+    return payload
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+    }
+
+def compare(results, baseline, threshold):
+    # Return (key, metric, old, new) for every metric that got worse than
+    # the baseline by more than the threshold fraction. Times (*_s) and
+    # memory (*_mb, *_mcell) regress upwards, throughput (*_per_s) downwards;
+    # counts are informational.
+    regressions = []
+    for key, metrics in results.items():
+        old = baseline.get('results', {}).get(key)
+        if not old:
+            continue
+        for metric, value in metrics.items():
+            before = old.get(metric)
+            if not isinstance(before, (int, float)) or not isinstance(value, (int, float)):
+                continue
+            if metric.endswith('_per_s'):
+                # Throughput: lower is worse.
+                if value < before / (1.0 + threshold):
+                    regressions.append((key, metric, before, value))
+                continue
+            if not metric.endswith(('_s', '_mb', '_mcell')):
+                continue
+            # Ignore noise on very small timings and allocations.
+            floor = 0.005 if metric.endswith('_s') else 1.0
+            if value > max(before, floor) * (1.0 + threshold):
+                regressions.append((key, metric, before, value))
+    return regressions
+
+def argumentParser(description):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--full', action='store_true',
+                        help='include the largest (slow) sizes')
+    parser.add_argument('--filter', default='',
+                        help='only run cases whose key contains this text')
+    parser.add_argument('--save-baseline', metavar='PATH',
+                        help='write results as a new baseline')
+    parser.add_argument('--compare', metavar='PATH',
+                        help='compare results against a baseline')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='allowed slowdown before a metric counts as a regression (default 0.25)')
+    return parser
+
+def main(suite, cases, options):
+    # cases: iterable of (key, module, caseName, args)
+    results = {}
+    for key, module, caseName, args in cases:
+        if options.filter and options.filter not in key:
+            continue
+        metrics = runIsolated(module, caseName, *args)
+        results[key] = metrics
+        print('%-40s %s' % (key, '  '.join('%s=%s' % item for item in sorted(metrics.items()))))
+        sys.stdout.flush()
+
+    report = {'suite': suite, 'environment': environment(), 'results': results}
+    if options.save_baseline:
+        with open(options.save_baseline, 'w') as baselineFile:
+            json.dump(report, baselineFile, indent=2, sort_keys=True)
+            baselineFile.write('\n')
+
+    if options.compare:
+        with open(options.compare) as baselineFile:
+            baseline = json.load(baselineFile)
+        regressions = compare(results, baseline, options.threshold)
+        for key, metric, before, after in regressions:
+            print('REGRESSION %s %s: %s -> %s' % (key, metric, before, after))
+        if regressions:
+            return 1
+        print('No regressions against %s' % options.compare)
+    return 0
@@ -0,0 +1,86 @@
+# Tests for changes to the vendored xlsxwriter.
+#
+#   python -m pytest tests
+
+import os
+import re
+import sys
+import zipfile
+
+import pytest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO, 'Modules'))
+
+import xlsxwriter
+from xlsxwriter.worksheet import _coalesce_ranges
+from xlsxwriter.worksheet import convert_cell_args, convert_column_args, convert_range_args
+
+
+class _Calls:
+    # Records the arguments the decorators pass on.
+    @convert_cell_args
+    def cell(self, *args):
+        return args
+
+    @convert_range_args
+    def range(self, *args):
+        return args
+
+    @convert_column_args
+    def columns(self, *args):
+        return args
+
+
+def test_int_args_pass_through():
+    calls = _Calls()
+    assert calls.cell(4, 2, 'x') == (4, 2, 'x')
+    assert calls.range(1, 2, 3, 4) == (1, 2, 3, 4)
+    assert calls.columns(1, 3, 9) == (1, 3, 9)
+    assert calls.cell() == ()
+
+
+def test_a1_args_are_converted():
+    calls = _Calls()
+    assert calls.cell('C5', 'x') == (4, 2, 'x')
+    assert calls.cell('$C$5', 'x') == (4, 2, 'x')
+    assert calls.range('B2:D4', 'x') == (1, 1, 3, 3, 'x')
+    assert calls.range('B2') == (1, 1, 1, 1)
+    assert calls.columns('B:D', 9) == (1, 3, 9)
+
+
+def test_int_like_strings_stay_row_col():
+    calls = _Calls()
+    assert calls.cell('5', 0, 'x') == ('5', 0, 'x')
+    assert calls.cell(' +5', 0) == (' +5', 0)
+    assert calls.range('1', 0, 2, 0) == ('1', 0, 2, 0)
+    assert calls.columns('2', 3) == ('2', 3)
+
+
+def test_other_args_fall_back_to_int():
+    calls = _Calls()
+    assert calls.cell(4.0, 2) == (4.0, 2)
+    assert calls.cell(True, 2) == (True, 2)
+    with pytest.raises(TypeError):
+        calls.cell(None, 2)
+
+
+def test_coalesce_ranges_drops_contained_ranges():
+    # "A1:C10 B3 A12:C12": B3 is inside A1:C10.
+    ranges = [(0, 0, 9, 2), (2, 1, 2, 1), (11, 0, 11, 2)]
+    assert _coalesce_ranges(ranges) == [(0, 0, 9, 2), (11, 0, 11, 2)]
+    # A merged range drops the ranges it now covers.
+    ranges = [(0, 0, 4, 0), (5, 0, 9, 0), (3, 0, 6, 0), (0, 1, 0, 1)]
+    assert _coalesce_ranges(ranges) == [(0, 0, 9, 0), (0, 1, 0, 1)]
+
+
+def test_coalesced_sqref_has_no_contained_ranges(tmp_path):
+    workbook = xlsxwriter.Workbook(str(tmp_path / 'rules.xlsx'), {'coalesce_rules': True})
+    worksheet = workbook.add_worksheet()
+    rule = {'type': 'cell', 'criteria': '<', 'value': 3}
+    for cells in ('A1:C10', 'B3', 'A12:C12'):
+        worksheet.conditional_format(cells, dict(rule))
+    workbook.close()
+    with zipfile.ZipFile(str(tmp_path / 'rules.xlsx')) as xlsx:
+        xml = xlsx.read('xl/worksheets/sheet1.xml').decode('utf-8')
+    assert re.findall(r'sqref="([^"]+)"', xml) == ['A1:C10 A12:C12']